@@ -1,10 +1,24 @@
 #
 
 import json
+import os
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-from class_tel_spr import load_xls
+from class_tel_spr import export_to_json
+from file_watcher import FileWatcher, file_state
+from import_worker import DatabaseWriter, ImportWorker
+from phone_lookup import PhoneDirectory
+from profiling import CPROFILE_FILE, span, tracer
+from record_diff import row_keys, save_reports
+from record_store import RecordStore
+from snapshot import SNAPSHOT_FILE, SnapshotError, load_snapshot, snapshot_key
+from search import SearchEngine
+from sqlite_store import DB_FILE, DirectoryDB
+from virtual_table import VirtualTable
+
+SETTINGS_FILE = os.path.join("JSON", "settings.json")  # Последняя книга и ее состояние при импорте
 
 
 class App:
@@ -18,10 +32,20 @@ class App:
 class BaseTab:
     """Базовый класс для вкладок"""
 
+    virtual = True  # Виртуальный режим таблицы: в Treeview создаются только видимые строки
+    search_delay = 250  # Пауза после нажатия клавиши перед поиском, мс
+
+    sheet = None  # Лист данных вкладки ("osfr" или "ks"), задает ключи строк (см. record_diff)
+
     def __init__(self, parent):
         self.parent = parent
         self.frame = ttk.Frame(parent)
         self.original_data = []
+        self.row_keys = None
+        self.pending_report = None
+        self.selected_key = None  # Ключ выделенной строки на время apply_changes
+        self.table = None
+        self.search_job = None
         self.create_widgets()
 
     def create_widgets(self):
@@ -32,22 +56,126 @@ class BaseTab:
         """Метод для загрузки данных (должен быть переопределен)"""
         pass
 
+    def row_values(self, item):
+        """Значения колонок таблицы для записи (должен быть переопределен)"""
+        return ()
+
     def clear_table(self):
         """Очистка таблицы"""
-        if hasattr(self, 'tree'):
-            for item in self.tree.get_children():
-                self.tree.delete(item)
+        if self.table:
+            self.table.set_rows([])
+        elif hasattr(self, 'tree'):
+            self.tree.delete(*self.tree.get_children())
 
+    def search_data(self, event=None):
+        """Поиск данных по ФИО и номерам телефонов (запускается после паузы в наборе)"""
+        if self.search_job is not None:
+            self.frame.after_cancel(self.search_job)
+        self.search_job = self.frame.after(self.search_delay, self.run_search)
 
-class Osfr(BaseTab):
-    """Класс для вкладки ОСФР"""
+    def run_search(self):
+        self.search_job = None
+        self.apply_filters()
+
+    def apply_filters(self):
+        """Метод применения фильтров (должен быть переопределен)"""
+        pass
+
+    def get_row_keys(self):
+        """Ключи строк текущих данных, служат iid строк таблицы"""
+        if self.pending_report is not None:
+            self.row_keys = self.pending_report.new_keys
+        elif self.row_keys is None:
+            self.row_keys = row_keys(self.original_data, self.sheet)
+        return self.row_keys
+
+    def show_rows(self, items):
+        """Отображение записей в таблице"""
+        with span("render", rows=len(items)):
+            self.render_rows(items)
+
+    def render_rows(self, items):
+        if self.table:
+            selected = None
+            if self.pending_report is not None and self.selected_key is not None:
+                # Выделение остается на той же записи, даже если ее номер в новых данных другой
+                keys = self.get_row_keys()
+                selected = next((index for index, item in enumerate(items) if keys[item.row] == self.selected_key),
+                                None)
+            self.table.set_rows(items, self.row_values, keep_position=self.pending_report is not None,
+                                selected=selected)
+            return
+        keys = self.get_row_keys()
+        if self.pending_report is not None:
+            self.sync_rows(items, keys)
+            return
+        self.clear_table()
+        for item in items:
+            self.tree.insert("", "end", iid=keys[item.row], values=self.row_values(item))
+
+    def sync_rows(self, items, keys):
+        """Приводит таблицу к новому набору записей, меняя только отличающиеся строки"""
+        target = [keys[item.row] for item in items]
+        target_set = set(target)
+        current = self.tree.get_children()
+        stale = [iid for iid in current if iid not in target_set]
+        if stale:
+            self.tree.delete(*stale)
+        existing = set(current).difference(stale)
+        updated = {key for key, _, _, _ in self.pending_report.updates}
+        for index, (key, item) in enumerate(zip(target, items)):
+            if key not in existing:
+                self.tree.insert("", index, iid=key, values=self.row_values(item))
+            elif key in updated:
+                self.tree.item(key, values=self.row_values(item))
+        if self.tree.get_children() != tuple(target):
+            # Порядок строк изменился - перестраиваем таблицу целиком
+            self.tree.delete(*self.tree.get_children())
+            for key, item in zip(target, items):
+                self.tree.insert("", "end", iid=key, values=self.row_values(item))
+
+    def apply_changes(self, data, report):
+        """
+        Подстановка данных повторного импорта: в таблице обновляются только строки из отчета
+        :param data: новые данные (RecordStore)
+        :param report: ChangeReport (record_diff.diff_stores) между текущими и новыми данными
+        """
+        selected = self.table.selected_item() if self.table else None
+        self.selected_key = self.get_row_keys()[selected.row] if selected is not None else None
+        self.pending_report = report
+        try:
+            self.set_data(data)
+        finally:
+            self.pending_report = None
+            self.selected_key = None
+
+
+class DirectoryTab(BaseTab):
+    """
+    Вкладка справочника, описанная схемой: колонки таблицы, поля поиска и поле подразделения.
+    Таблица, список подразделений и фильтрация общие для всех листов.
+    """
+
+    # Колонки таблицы: (идентификатор, поле записи, заголовок, ширина)
+    columns = ()
+    name_fields = ()  # Поля ФИО для поиска
+    phone_fields = ()  # Поля с номерами телефонов для поиска
+    dept_field = None  # Поле подразделения для фильтра
+    dept_placeholder = "--- Выберите подразделение ---"  # Первый пункт списка подразделений (без фильтра)
+    json_file = None  # JSON с данными вкладки по умолчанию (load_data)
 
     def __init__(self, parent):
-        self.podrazdel_list = ["--- Выберите подразделение ---", ]
+        self.podrazdel_list = [self.dept_placeholder, ]
+        self.podrazdel_search = [(self.dept_placeholder.casefold(), self.dept_placeholder)]
+        self.dept_labels = {}  # Пункт списка "подразделение (число)" -> подразделение
+        self.search_engine = SearchEngine(self.name_fields, self.phone_fields, self.dept_field)
+        self.value_columns = []
+        self.database = None  # DirectoryDB, если данные вкладки читаются из SQLite
+        self.db_filter = None  # Параметры последнего запроса к базе
         super().__init__(parent)
 
     def create_widgets(self):
-        """Создает виджеты для вкладки ОСФР"""
+        """Создает виджеты вкладки"""
         # Основной контейнер для фильтров
         filters_container = tk.Frame(self.frame)
         filters_container.pack(padx=10, pady=10, fill='x')
@@ -78,6 +206,16 @@ class Osfr(BaseTab):
         )
         btn_clear_search.pack(side='left', padx=5)
 
+        # Нечеткий поиск: опечатки, ошибка раскладки, лучшие совпадения первыми
+        self.fuzzy_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            search_frame,
+            text="С опечатками",
+            variable=self.fuzzy_var,
+            command=self.apply_filters,
+            font=('Arial', 9)
+        ).pack(side='left', padx=5)
+
         # ВТОРАЯ СТРОКА: Фильтр по подразделениям
         dept_frame = tk.Frame(filters_container)
         dept_frame.pack(fill='x', pady=(0, 10))
@@ -110,47 +248,20 @@ class Osfr(BaseTab):
         self.create_table()
 
     def create_table(self):
-        """Создает таблицу для отображения данных"""
+        """Создает таблицу для отображения данных по колонкам схемы"""
         # Создаем и настраиваем стиль
         style = ttk.Style()
         style.configure("Custom.Treeview.Heading",
                         padding=(0, 5, 0, 25),
                         font=('Arial', 10, 'bold'))
 
-        columns = ("city_phone", "internal_phone", "room", "last_name", "first_name", "patronymic", "position",
-                   "department", "location")
-
-        # Многострочные заголовки
-        headings = {
-            "city_phone": "Городской\nномер",
-            "internal_phone": "Корп.\nтелефон",
-            "room": "Номер\nкомнаты",
-            "last_name": "Фамилия",
-            "first_name": "Имя",
-            "patronymic": "Отчество",
-            "position": "Должность",
-            "department": "Отдел",
-            "location": "Место\nрасположения"
-        }
-
-        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings",
+        self.tree = ttk.Treeview(self.frame, columns=[column[0] for column in self.columns], show="headings",
                                  height=15, style="Custom.Treeview")
 
-        # Настраиваем заголовки и колонки
-        for col in columns:
-            self.tree.heading(col, text=headings[col], anchor="center")
-            self.tree.column(col, width=100, anchor="w")
-
-        # Индивидуальные ширины колонок
-        self.tree.column("last_name", width=120)
-        self.tree.column("first_name", width=100)
-        self.tree.column("patronymic", width=120)
-        self.tree.column("position", width=150)
-        self.tree.column("department", width=120)
-        self.tree.column("city_phone", width=100)
-        self.tree.column("internal_phone", width=100)
-        self.tree.column("room", width=80)
-        self.tree.column("location", width=200)
+        # Настраиваем заголовки и ширины колонок
+        for col, _, heading, width in self.columns:
+            self.tree.heading(col, text=heading, anchor="center")
+            self.tree.column(col, width=width, anchor="w")
 
         # Scrollbar для таблицы
         scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
@@ -160,99 +271,127 @@ class Osfr(BaseTab):
         self.tree.pack(fill='both', expand=True, side='left', padx=5, pady=5)
         scrollbar.pack(side='right', fill='y')
 
-    def load_data(self, file_path):
+        if self.virtual:
+            self.table = VirtualTable(self.tree, scrollbar)
+
+    def load_data(self, file_path=None):
         """Загрузка и отображение JSON данных"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
+            with open(file_path or self.json_file, 'r', encoding='utf-8') as file:
                 data = json.load(file)
 
-            # Сохраняем оригинальные данные для фильтрации
-            self.original_data = data
-
-            # Очищаем существующие данные в таблице
-            self.clear_table()
-
-            # Добавляем данные в таблицу
-            for item in data:
-                self.tree.insert("", "end", values=(
-                    item.get("Городской номер", ""),
-                    item.get("Кор. тел.", ""),
-                    item.get("№ комн.", ""),
-                    item.get("ФАМИЛИЯ", ""),
-                    item.get("ИМЯ", ""),
-                    item.get("ОТЧЕСТВО", ""),
-                    item.get("ДОЛЖНОСТЬ", ""),
-                    item.get("Отдел", ""),
-                    item.get("Место расположения", "")
-                ))
-
-            self.podrazdel_list = self.create_podrazdel_list(data)
-            self.update_combobox()
+            self.set_data(data)
 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Нет данных для отображения:\nЗагрузите файл с номерами телефонов")
             print(str(e))
 
-    def create_podrazdel_list(self, data):
-        """Создает список подразделений"""
-        lst = []
-        for item in data:
-            if item.get("Отдел") not in lst and item.get("Отдел") != "":
-                lst.append(item.get("Отдел"))
-        lst = ["--- Выберите подразделение ---", ] + lst
+    def set_data(self, data):
+        """Замена данных вкладки (таблица и список подразделений обновляются целиком)"""
+        # Сохраняем оригинальные данные для фильтрации в компактном хранилище по колонкам
+        data = RecordStore.from_dicts(data)
+        self.database = None
+        self.original_data = data
+        self.row_keys = None
+        # Значения ячеек берутся прямо из списков колонок хранилища по номеру строки
+        self.value_columns = [data.column(field) for _, field, _, _ in self.columns]
+        with span("index", rows=len(data)):
+            self.search_engine.set_data(data)
+
+        self.refresh_departments()
+
+        # Отображаем данные с учетом уже введенных фильтров
+        self.apply_filters()
+
+    def set_database(self, database):
+        """
+        Данные вкладки в базе SQLite: фильтры выполняются запросами по индексам,
+        таблица подгружает только видимые строки (LIMIT/OFFSET)
+        """
+        if not self.table:
+            raise ValueError("Работа с базой требует виртуального режима таблицы")
+        self.database = database
+        self.db_filter = None
+        self.original_data = []
+        self.row_keys = None
+        self.value_columns = []
+        self.search_engine.set_data([])
+        self.refresh_departments()
+        self.apply_filters()
+
+    def row_values(self, item):
+        """Значения колонок таблицы для записи"""
+        if self.database is not None:
+            return tuple(item.get(field, "") for _, field, _, _ in self.columns)
+        row = item.row
+        return tuple(values[row] for values in self.value_columns)
+
+    def refresh_departments(self):
+        """Новый список подразделений: выбранное остается выбранным, число записей в пункте списка обновляется"""
+        selected_dept = self.selected_dept()
+        self.podrazdel_list = self.create_podrazdel_list()
+        self.update_combobox()
+        if selected_dept in self.dept_labels.values():
+            self.podrazdel_var.set(next(label for label, dept in self.dept_labels.items() if dept == selected_dept))
+
+    def create_podrazdel_list(self):
+        """
+        Список подразделений с числом записей, строится по корзинам поискового движка
+        за один проход при загрузке данных
+        """
+        self.dept_labels = {}
+        lst = [self.dept_placeholder, ]
+        departments = (self.database.departments(self.sheet) if self.database is not None
+                       else self.search_engine.departments())
+        for dept, count in departments:
+            label = f"{dept} ({count})"
+            self.dept_labels[label] = dept
+            lst.append(label)
+        self.podrazdel_search = [(label.casefold(), label) for label in lst]
         return lst
 
     def podrazdel_filter(self, event=None):
         """Фильтрация списка подразделений по введенному тексту"""
-        current_text = self.podrazdel_var.get()
+        current_text = self.podrazdel_var.get().casefold()
         if current_text:
-            filtered_list = [item for item in self.podrazdel_list if current_text.lower() in item.lower()]
+            filtered_list = [label for text, label in self.podrazdel_search if current_text in text]
             self.podrazdel_combobox['values'] = filtered_list
         else:
             self.podrazdel_combobox['values'] = self.podrazdel_list
 
-    def search_data(self, event=None):
-        """Поиск данных по ФИО и номерам телефонов"""
-        self.apply_filters()
+    def selected_dept(self):
+        """Выбранное подразделение: пункт списка с числом записей или название, введенное вручную"""
+        selected = self.podrazdel_var.get()
+        if selected == self.dept_placeholder:
+            return ""
+        return self.dept_labels.get(selected, selected)
 
     def apply_filters(self):
         """Применяет все активные фильтры"""
-        selected_dept = self.podrazdel_var.get()
-        search_text = self.search_var.get().lower().strip()
-
-        # Очищаем таблицу
-        self.clear_table()
-
-        # Начинаем с оригинальных данных
-        filtered_data = self.original_data
-
-        # Применяем фильтр по подразделению
-        if selected_dept and selected_dept != "--- Выберите подразделение ---":
-            filtered_data = [item for item in filtered_data if item.get("Отдел") == selected_dept]
+        with tracer.operation("Фильтр"):
+            self.filter_rows()
+
+    def filter_rows(self):
+        selected_dept = self.selected_dept()
+
+        if self.database is not None:
+            # Поиск по началам слов (FTS5) и окончанию номера, режим опечаток к базе не применяется
+            db_filter = (self.search_var.get().strip(), selected_dept or None)
+            if db_filter != self.db_filter:
+                self.db_filter = db_filter
+                with span("filter", database=True):
+                    rows = self.database.query(self.sheet, *db_filter)
+                self.show_rows(rows)
+            return
 
-        # Применяем поисковый фильтр
-        if search_text:
-            filtered_data = [item for item in filtered_data if (
-                    search_text in item.get("ФАМИЛИЯ", "").lower() or
-                    search_text in item.get("ИМЯ", "").lower() or
-                    search_text in item.get("ОТЧЕСТВО", "").lower() or
-                    search_text in item.get("Городской номер", "").lower() or
-                    search_text in item.get("Кор. тел.", "").lower()
-            )]
+        # Повторный запрос с теми же параметрами не перерисовывает таблицу
+        with span("filter"):
+            changed = self.search_engine.update(self.search_var.get(), selected_dept or None, self.fuzzy_var.get())
+        if not changed:
+            return
 
         # Добавляем отфильтрованные данные в таблицу
-        for item in filtered_data:
-            self.tree.insert("", "end", values=(
-                item.get("Городской номер", ""),
-                item.get("Кор. тел.", ""),
-                item.get("№ комн.", ""),
-                item.get("ФАМИЛИЯ", ""),
-                item.get("ИМЯ", ""),
-                item.get("ОТЧЕСТВО", ""),
-                item.get("ДОЛЖНОСТЬ", ""),
-                item.get("Отдел", ""),
-                item.get("Место расположения", "")
-            ))
+        self.show_rows(self.search_engine.result)
 
     def on_select(self, event=None):
         """Обработчик выбора подразделения"""
@@ -273,240 +412,46 @@ class Osfr(BaseTab):
         self.podrazdel_combobox['values'] = self.podrazdel_list
 
 
-class ClientService(BaseTab):
-    """Класс для вкладки Клиентские службы"""
-
-    def __init__(self, parent):
-        super().__init__(parent)
-
-    def create_widgets(self):
-        """Создает виджеты для вкладки Клиентские службы"""
-        # Основной контейнер для фильтров
-        filters_container = tk.Frame(self.frame)
-        filters_container.pack(padx=10, pady=10, fill='x')
-
-        # ПЕРВАЯ СТРОКА: Поиск по ФИО и телефонам
-        search_frame = tk.Frame(filters_container)
-        search_frame.pack(fill='x', pady=(0, 10))
-        #
-        label_search = tk.Label(search_frame, text="Поиск (ФИО/телефон):", font=('Arial', 10))
-        label_search.pack(side='left', padx=5)
-
-        self.search_var = tk.StringVar()
-        self.search_entry = tk.Entry(
-            search_frame,
-            textvariable=self.search_var,
-            font=('Arial', 10),
-            width=40
-        )
-        self.search_entry.pack(side='left', padx=5)
-        self.search_entry.bind("<KeyRelease>", self.search_data)
-
-        # Кнопка сброса поиска
-        btn_clear_search = tk.Button(
-            search_frame,
-            text="Очистить поиск",
-            command=self.clear_search,
-            font=('Arial', 9)
-        )
-        btn_clear_search.pack(side='left', padx=5)
-
-        # # ВТОРАЯ СТРОКА: Фильтр по подразделениям
-        dept_frame = tk.Frame(filters_container)
-        dept_frame.pack(fill='x', pady=(0, 10))
-
-        label_dept = tk.Label(dept_frame, text="Фильтр по подразделению:", font=('Arial', 10))
-        label_dept.pack(side='left', padx=5)
-
-        self.podrazdel_var = tk.StringVar()
-        self.podrazdel_combobox = ttk.Combobox(
-            dept_frame,
-            textvariable=self.podrazdel_var,
-            state="normal",
-            font=('Arial', 10),
-            width=100
-        )
-        self.podrazdel_combobox.pack(side='left', padx=5)
-        self.podrazdel_combobox.bind("<KeyRelease>", self.podrazdel_filter)
-        self.podrazdel_combobox.bind("<<ComboboxSelected>>", self.on_select)
-
-        # Кнопка сброса фильтра подразделения
-        btn_reset_dept = tk.Button(
-            dept_frame,
-            text="Сбросить фильтр",
-            command=self.reset_filter,
-            font=('Arial', 9)
-        )
-        btn_reset_dept.pack(side='left', padx=5)
-
-        # Создаем таблицу
-        self.create_table()
-
-    def create_podrazdel_list(self, data):
-        """Создает список подразделений"""
-        lst = []
-        for item in data:
-            if item.get("отдел") not in lst and item.get("отдел") != "":
-                lst.append(item.get("отдел"))
-        lst = ["--- Выберите Клиентскую службу ---", ] + lst
-        return lst
-
-    def search_data(self, event=None):
-        """Поиск данных по ФИО и номерам телефонов"""
-        self.apply_filters()
-
-    def update_combobox(self):
-        """Обновление значений combobox"""
-        self.podrazdel_combobox['values'] = self.podrazdel_list
-
-    def podrazdel_filter(self, event=None):
-        """Фильтрация списка подразделений по введенному тексту"""
-        current_text = self.podrazdel_var.get()
-        if current_text:
-            filtered_list = [item for item in self.podrazdel_list if current_text.lower() in item.lower()]
-            self.podrazdel_combobox['values'] = filtered_list
-        else:
-            self.podrazdel_combobox['values'] = self.podrazdel_list
-
-    def create_table(self):
-        """Создает таблицу для отображения данных"""
-        # Создаем и настраиваем стиль
-        style = ttk.Style()
-        style.configure("Custom.Treeview.Heading",
-                        padding=(0, 5, 0, 25),
-                        font=('Arial', 10, 'bold'))
-
-        columns = ("city_phone", "internal_phone", "last_name", "first_name", "patronymic", "position",
-                   "department", "location")
-
-        # Многострочные заголовки
-        headings = {
-            "city_phone": "Городской\nномер",
-            "internal_phone": "Корп.\nтелефон",
-            "last_name": "Фамилия",
-            "first_name": "Имя",
-            "patronymic": "Отчество",
-            "position": "Должность",
-            "department": "Клиентская\nслужба",
-            "location": "Место\nрасположения"
-        }
-
-        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings",
-                                 height=15, style="Custom.Treeview")
-
-        # Настраиваем заголовки и колонки
-        for col in columns:
-            self.tree.heading(col, text=headings[col], anchor="center")
-            self.tree.column(col, width=100, anchor="w")
-
-        # Индивидуальные ширины колонок
-        self.tree.column("last_name", width=120)
-        self.tree.column("first_name", width=100)
-        self.tree.column("patronymic", width=120)
-        self.tree.column("position", width=150)
-        self.tree.column("department", width=120)
-        self.tree.column("city_phone", width=100)
-        self.tree.column("internal_phone", width=100)
-        self.tree.column("location", width=200)
-
-        # Scrollbar для таблицы
-        scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
-        # Позиционируем виджеты
-        self.tree.pack(fill='both', expand=True, side='left', padx=5, pady=5)
-        scrollbar.pack(side='right', fill='y')
-
-
-
-        # Здесь можно добавить специфичные для клиентских служб виджеты
-        # Например, другую таблицу или фильтры
-
-    def load_data(self, file_path='JSON/ks.json'):
-        """Загрузка данных для клиентских служб"""
-        # Реализация загрузки данных для клиентских служб
-
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-
-            # Сохраняем оригинальные данные для фильтрации
-            self.original_data = data
-
-            # Очищаем существующие данные в таблице
-            self.clear_table()
-
-            # Добавляем данные в таблицу
-            for item in data:
-                self.tree.insert("", "end", values=(
-                    item.get("город", ""),
-                    item.get("кспд", ""),
-                    item.get("Фамилия", ""),
-                    item.get("Имя", ""),
-                    item.get("Отчество", ""),
-                    item.get("Должность", ""),
-                    item.get("отдел", ""),
-                    item.get("Место расположения", "")
-                ))
-
-            self.podrazdel_list = self.create_podrazdel_list(data)
-            self.update_combobox()
-
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Нет данных для отображения:\nЗагрузите файл с номерами телефонов")
-            print(str(e))
-
-    def apply_filters(self):
-        """Применяет все активные фильтры"""
-        selected_dept = self.podrazdel_var.get()
-        search_text = self.search_var.get().lower().strip()
-
-        # Очищаем таблицу
-        self.clear_table()
-
-        # Начинаем с оригинальных данных
-        filtered_data = self.original_data
-
-        # Применяем фильтр по подразделению
-        if selected_dept and selected_dept != "--- Выберите Клиентскую службу ---":
-            filtered_data = [item for item in filtered_data if item.get("отдел") == selected_dept]
-
-        # Применяем поисковый фильтр
-        if search_text:
-            filtered_data = [item for item in filtered_data if (
-                    search_text in item.get("Фамилия", "").lower() or
-                    search_text in item.get("Имя", "").lower() or
-                    search_text in item.get("Отчество", "").lower() or
-                    search_text in item.get("город", "").lower() or
-                    search_text in item.get("кспд", "").lower()
-            )]
-
-        # Добавляем отфильтрованные данные в таблицу
-        for item in filtered_data:
-            self.tree.insert("", "end", values=(
-                item.get("город", ""),
-                item.get("кспд", ""),
-                item.get("Фамилия", ""),
-                item.get("Имя", ""),
-                item.get("Отчество", ""),
-                item.get("Должность", ""),
-                item.get("отдел", ""),
-                item.get("Место расположения", "")
-            ))
-
-    def on_select(self, event=None):
-        """Обработчик выбора подразделения"""
-        self.apply_filters()
+class Osfr(DirectoryTab):
+    """Класс для вкладки ОСФР"""
 
-    def clear_search(self):
-        """Очистка поля поиска"""
-        self.search_var.set("")
-        self.apply_filters()
+    sheet = "osfr"
+    columns = (
+        ("city_phone", "Городской номер", "Городской\nномер", 100),
+        ("internal_phone", "Кор. тел.", "Корп.\nтелефон", 100),
+        ("room", "№ комн.", "Номер\nкомнаты", 80),
+        ("last_name", "ФАМИЛИЯ", "Фамилия", 120),
+        ("first_name", "ИМЯ", "Имя", 100),
+        ("patronymic", "ОТЧЕСТВО", "Отчество", 120),
+        ("position", "ДОЛЖНОСТЬ", "Должность", 150),
+        ("department", "Отдел", "Отдел", 120),
+        ("location", "Место расположения", "Место\nрасположения", 200),
+    )
+    name_fields = ("ФАМИЛИЯ", "ИМЯ", "ОТЧЕСТВО")
+    phone_fields = ("Городской номер", "Кор. тел.")
+    dept_field = "Отдел"
+    json_file = "JSON/osfr.json"
+
+
+class ClientService(DirectoryTab):
+    """Класс для вкладки Клиентские службы"""
 
-    def reset_filter(self):
-        """Сброс фильтра подразделения"""
-        self.podrazdel_var.set("")
-        self.apply_filters()
+    sheet = "ks"
+    columns = (
+        ("city_phone", "город", "Городской\nномер", 100),
+        ("internal_phone", "кспд", "Корп.\nтелефон", 100),
+        ("last_name", "Фамилия", "Фамилия", 120),
+        ("first_name", "Имя", "Имя", 100),
+        ("patronymic", "Отчество", "Отчество", 120),
+        ("position", "Должность", "Должность", 150),
+        ("department", "отдел", "Клиентская\nслужба", 120),
+        ("location", "Место расположения", "Место\nрасположения", 200),
+    )
+    name_fields = ("Фамилия", "Имя", "Отчество")
+    phone_fields = ("город", "кспд")
+    dept_field = "отдел"
+    dept_placeholder = "--- Выберите Клиентскую службу ---"
+    json_file = "JSON/ks.json"
 
 
 class Window:
@@ -514,7 +459,14 @@ class Window:
     Класс окна приложения
     """
 
-    def __init__(self, root):
+    incremental_import = True  # Повторный импорт обновляет только изменившиеся строки
+    import_workers = None  # Число процессов импорта (None - в потоке импорта, см. load_xls)
+    use_database = False  # Вкладки читают данные из базы SQLite (DB_FILE), а не из снимка в памяти (меню "Файл")
+    watch_interval = 2.0  # Период проверки изменения последней книги, с
+    watch_settle = 1.0  # Сколько книга не должна меняться перед повторным импортом, с
+
+    def __init__(self, root, start_time=None):
+        self.start_time = start_time if start_time is not None else time.perf_counter()
         self.app = App()
         self.root = root
         self.root.geometry("1200x500")
@@ -524,40 +476,392 @@ class Window:
         # Создаем экземпляры вкладок
         self.osfr_tab = None
         self.client_service_tab = None
+        self.import_worker = None
+        self.database_writer = None  # Запись вкладок в базу при включении use_database
+        self.import_state = None  # Состояние книги (file_state) в начале текущего импорта
+        self.watcher = None
+        self.reload_path = None  # Книга изменилась, импорт запустится, когда закончится текущий
+        self.phone_directory = None
+        self.database = None  # DirectoryDB в режиме use_database
+        self.import_mark = 0  # Начало замеров текущего импорта
+        self.sheets = {}  # Данные вкладок
+        self.pending = {}  # Вкладки, данные которых еще не отображены
+        self.use_database = self.load_settings().get("use_database", self.use_database)
 
         self.create_menu()
+        self.create_status_bar()
+        tracer.listener = self.status_var.set  # Сводка замеров после каждой операции
+        self.create_phone_lookup()
         self.create_widgets()
+        self.root.after_idle(self.report_startup_time)
+
+    def report_startup_time(self):
+        """Время от запуска программы до первого простоя окна"""
+        elapsed = (time.perf_counter() - self.start_time) * 1000
+        self.status_var.set(f"Запуск: {elapsed:.0f} мс")
+        print(f"Время запуска: {elapsed:.0f} мс")
 
     def create_menu(self):
         """Создает меню для приложения"""
         menubar = tk.Menu(self.root)
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Открыть", command=self.open_file_xls)
+        file_menu.add_command(label="Экспорт в JSON", command=self.export_json)
+        self.auto_reload_var = tk.BooleanVar(value=True)
+        file_menu.add_checkbutton(label="Обновлять при изменении книги", variable=self.auto_reload_var,
+                                  command=self.toggle_auto_reload)
+        self.database_var = tk.BooleanVar(value=self.use_database)
+        file_menu.add_checkbutton(label="Хранить справочник в базе SQLite", variable=self.database_var,
+                                  command=self.toggle_database)
         file_menu.add_separator()
         file_menu.add_command(label="Выход", command=self.root.destroy)
         menubar.add_cascade(label="Файл", menu=file_menu)
+
+        debug_menu = tk.Menu(menubar, tearoff=0)
+        self.profile_var = tk.BooleanVar(value=tracer.enabled)
+        self.cprofile_var = tk.BooleanVar(value=False)
+        debug_menu.add_checkbutton(label="Замеры этапов", variable=self.profile_var, command=self.toggle_profiling)
+        debug_menu.add_checkbutton(label=f"Профиль cProfile при импорте ({CPROFILE_FILE})", variable=self.cprofile_var)
+        debug_menu.add_separator()
+        debug_menu.add_command(label="Сохранить замеры (Chrome trace)...",
+                               command=lambda: self.save_trace(tracer.export_chrome_trace))
+        debug_menu.add_command(label="Сохранить замеры (JSON)...", command=lambda: self.save_trace(tracer.export_json))
+        debug_menu.add_command(label="Очистить замеры", command=tracer.clear)
+        menubar.add_cascade(label="Отладка", menu=debug_menu)
         self.root.config(menu=menubar)
 
+    def toggle_profiling(self):
+        tracer.enabled = self.profile_var.get()
+
+    def save_trace(self, export):
+        """Сохраняет собранные замеры в файл"""
+        file_path = filedialog.asksaveasfilename(defaultextension=".json",
+                                                 filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not file_path:
+            return
+        try:
+            export(file_path)
+            self.status_var.set(f"Замеры сохранены: {file_path} ({len(tracer.spans)} этапов)")
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить замеры:\n{str(e)}")
+
+    def create_status_bar(self):
+        """Создает строку состояния с индикатором импорта"""
+        status_frame = tk.Frame(self.root)
+        status_frame.pack(side='bottom', fill='x', padx=10, pady=(0, 5))
+
+        self.status_var = tk.StringVar()
+        tk.Label(status_frame, textvariable=self.status_var, font=('Arial', 9), anchor='w').pack(
+            side='left', fill='x', expand=True)
+
+        self.btn_cancel_import = tk.Button(
+            status_frame,
+            text="Отменить импорт",
+            command=self.cancel_import,
+            font=('Arial', 9)
+        )
+
+        self.progress = ttk.Progressbar(status_frame, orient='horizontal', length=250, mode='determinate',
+                                        maximum=100)
+
+    def create_phone_lookup(self):
+        """Создает строку поиска владельца по номеру телефона"""
+        lookup_frame = tk.Frame(self.root)
+        lookup_frame.pack(side='top', fill='x', padx=10, pady=(10, 0))
+
+        tk.Label(lookup_frame, text="Кто звонил (номер):", font=('Arial', 10)).pack(side='left', padx=5)
+
+        self.lookup_var = tk.StringVar()
+        lookup_entry = tk.Entry(lookup_frame, textvariable=self.lookup_var, font=('Arial', 10), width=25)
+        lookup_entry.pack(side='left', padx=5)
+        lookup_entry.bind("<Return>", self.lookup_phone)
+
+        tk.Button(lookup_frame, text="Найти", command=self.lookup_phone, font=('Arial', 9)).pack(
+            side='left', padx=5)
+
+        self.lookup_result_var = tk.StringVar()
+        tk.Label(lookup_frame, textvariable=self.lookup_result_var, font=('Arial', 10), anchor='w',
+                 justify='left').pack(side='left', fill='x', expand=True, padx=5)
+
+    def set_sheets(self, osfr_data, ks_data):
+        """Новые данные: видимая вкладка заполняется сразу, остальные - при первом переходе на них"""
+        self.sheets = {self.osfr_tab: osfr_data, self.client_service_tab: ks_data}
+        self.pending = dict(self.sheets)
+        self.phone_directory = None  # Перестроится при первом поиске номера
+        self.on_tab_changed()
+
+    def attach_database(self):
+        """Переводит вкладки на данные из базы SQLite, справочник в память не загружается"""
+        self.sheets = {}
+        self.pending = {}
+        self.phone_directory = None
+        self.database.reload()
+        for tab in (self.osfr_tab, self.client_service_tab):
+            tab.set_database(self.database)
+
+    def current_tab(self):
+        selected = self.notebook.select()
+        for tab in (self.osfr_tab, self.client_service_tab):
+            if str(tab.frame) == selected:
+                return tab
+        return None
+
+    def on_tab_changed(self, event=None):
+        """Заполняет открытую вкладку, если ее данные еще не отображались"""
+        tab = self.current_tab()
+        data = self.pending.pop(tab, None)
+        if data is not None:
+            tab.set_data(data)
+
+    def get_phone_directory(self):
+        """Справочник номеров, строится по данным вкладок при первом обращении"""
+        if self.database is not None and not self.sheets:
+            return self.database  # Поиск номера запросом к базе
+        if self.phone_directory is None:
+            self.phone_directory = PhoneDirectory.from_records(self.sheets.get(self.osfr_tab, ()),
+                                                               self.sheets.get(self.client_service_tab, ()))
+        return self.phone_directory
+
+    def lookup_phone(self, event=None):
+        """Поиск владельца введенного номера"""
+        number = self.lookup_var.get().strip()
+        if not number:
+            self.lookup_result_var.set("")
+            return
+        owners = self.get_phone_directory().lookup(number)
+        if not owners:
+            self.lookup_result_var.set("Номер не найден")
+            return
+        self.lookup_result_var.set("; ".join(
+            f"{owner['фио']} - {owner['должность']}, {owner['подразделение']} ({owner['источник']}, {owner['номер']})"
+            for owner in owners))
+
     def open_file_xls(self):
         """Открывает диалоговое окно для выбора файла"""
+        if self.busy():
+            messagebox.showinfo("Импорт", "Дождитесь окончания текущего импорта")
+            return
         file_path = filedialog.askopenfilename(
             filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
         )
         if not file_path:
             return
+        self.start_import(file_path)
+
+    def start_import(self, file_path, auto=False):
+        """
+        Запускает импорт книги в фоновом потоке
+        :param auto: повторный импорт по изменению книги - ошибки выводятся только в строке состояния
+        """
         try:
-            load_xls(file_path)
-            if self.osfr_tab:
-                self.osfr_tab.load_data('JSON/osfr.json')
-            if self.client_service_tab:
-                self.client_service_tab.load_data('JSON/ks.json')
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить файл:\n{str(e)}")
+            self.import_state = file_state(file_path)
+        except OSError:
+            self.import_state = None
+        previous = None
+        if self.incremental_import and not self.use_database and self.osfr_tab in self.sheets and self.client_service_tab in self.sheets:
+            previous = {"osfr": RecordStore.from_dicts(self.sheets[self.osfr_tab]),
+                        "ks": RecordStore.from_dicts(self.sheets[self.client_service_tab])}
+        self.import_worker = ImportWorker(file_path, previous, self.import_workers,
+                                          DB_FILE if self.use_database else None,
+                                          CPROFILE_FILE if self.cprofile_var.get() else None, auto)
+        self.import_mark = tracer.mark()
+        self.progress['value'] = 0
+        self.btn_cancel_import.pack(side='right', padx=5)
+        self.progress.pack(side='right', padx=5)
+        self.status_var.set("Книга изменена, обновление..." if auto else "Импорт...")
+        self.import_worker.start()
+        self.root.after(100, self.poll_import)
+
+    def poll_import(self):
+        """Забирает сообщения фонового импорта (вызывается по таймеру в потоке Tk)"""
+        worker = self.import_worker
+        for kind, text, percent in worker.poll():
+            if kind == "progress":
+                self.status_var.set(text)
+                self.progress['value'] = percent
+            elif kind == "done":
+                self.finish_import(worker)
+                return
+        self.root.after(100, self.poll_import)
+
+    def finish_import(self, worker):
+        """Подставляет новые данные во вкладки одним шагом после окончания импорта"""
+        self.progress.pack_forget()
+        self.btn_cancel_import.pack_forget()
+
+        # Известное watcher состояние книги обновляется только после успешного импорта (remember_workbook):
+        # отмененное изменение подхватится при следующем сохранении или запуске
+        if worker.cancelled:
+            self.status_var.set("Импорт отменен")
+            return
+        ks_data, osfr_data = worker.result if worker.result else (None, None)
+        if worker.error or ks_data is None or osfr_data is None:
+            self.status_var.set(f"Ошибка импорта: {worker.error or worker.path_xls}")
+            if worker.auto:
+                # Книга могла быть занята Excel во время сохранения - повторим с растущей задержкой
+                if not self.watcher.failed():
+                    self.status_var.set(f"Ошибка импорта: {worker.error or worker.path_xls}. "
+                                        f"Повтор - после следующего изменения книги")
+            else:
+                messagebox.showerror("Ошибка", f"Не удалось загрузить файл:\n{worker.error or worker.path_xls}")
+            return
+
+        with span("apply"):
+            if worker.reports:
+                self.apply_changes(osfr_data, ks_data, worker.reports)
+            elif self.use_database:
+                self.open_database()
+                self.attach_database()
+            else:
+                self.set_sheets(osfr_data, ks_data)
+        if not worker.reports:
+            self.status_var.set(f"Загружено: ОСФР - {len(osfr_data)}, клиентские службы - {len(ks_data)}")
+        if tracer.enabled:
+            tracer.report("Импорт", self.import_mark)
+        self.remember_workbook(worker.path_xls, self.import_state)
+
+    def apply_changes(self, osfr_data, ks_data, reports):
+        """Повторный импорт: во вкладки передаются только изменения, отчет пишется в JSON/changes.json"""
+        for tab, data, report in ((self.osfr_tab, osfr_data, reports["osfr"]),
+                                  (self.client_service_tab, ks_data, reports["ks"])):
+            if not report:
+                continue  # Лист не изменился - данные и таблица остаются прежними
+            self.sheets[tab] = data
+            if tab in self.pending or not tab.original_data:
+                self.pending[tab] = data  # Вкладка еще не отображалась
+            else:
+                tab.apply_changes(data, report)
+        self.phone_directory = None
+        self.on_tab_changed()
+
+        try:
+            save_reports(reports.values())
+        except OSError as e:
+            print(f"Не удалось сохранить отчет об изменениях: {e}")
+        summary = "; ".join(f"{name}: {report.summary()}"
+                            for name, report in (("ОСФР", reports["osfr"]), ("КС", reports["ks"])))
+        print(f"Изменения: {summary}")
+        self.status_var.set(f"Изменения - {summary}")
+
+    def load_settings(self):
+        try:
+            with open(SETTINGS_FILE, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_settings(self, **values):
+        """Обновляет значения в SETTINGS_FILE, остальные настройки сохраняются"""
+        settings = self.load_settings()
+        settings.update(values)
+        try:
+            os.makedirs(os.path.dirname(SETTINGS_FILE), exist_ok=True)
+            with open(SETTINGS_FILE, 'w', encoding='utf-8') as file:
+                json.dump(settings, file, ensure_ascii=False)
+        except OSError as e:
+            print(f"Не удалось сохранить настройки: {e}")
+
+    def remember_workbook(self, path, state):
+        """Запоминает импортированную книгу: за ней следит watcher, после перезапуска - тоже"""
+        if self.watcher is not None:
+            self.watcher.watch(path, state)
+        self.save_settings(last_workbook=path, state=state)
+
+    def toggle_database(self):
+        """
+        Переключение хранения справочника: база SQLite или данные в памяти.
+        Если в базе нет текущих данных, они записываются в нее из вкладок в фоновом потоке.
+        """
+        if self.busy():
+            self.database_var.set(self.use_database)
+            messagebox.showinfo("Импорт", "Дождитесь окончания текущего импорта")
+            return
+        self.use_database = self.database_var.get()
+        self.save_settings(use_database=self.use_database)
+        if not self.use_database:
+            self.load_sheets()  # Вкладки снова работают с данными в памяти (снимок)
+            self.status_var.set("Справочник в памяти")
+            return
+        database = self.open_database()
+        key = snapshot_key(SNAPSHOT_FILE) or ""
+        if self.sheets and (database.source_key() != key or not {"osfr", "ks"} <= set(database.sheets())):
+            # Пока идет запись, вкладки работают с данными в памяти
+            self.status_var.set("Запись справочника в базу...")
+            self.database_writer = DatabaseWriter(DB_FILE, {
+                "osfr": RecordStore.from_dicts(self.sheets[self.osfr_tab]),
+                "ks": RecordStore.from_dicts(self.sheets[self.client_service_tab])}, key)
+            self.database_writer.start()
+            self.root.after(100, self.poll_database_writer)
+            return
+        self.finish_database()
+
+    def poll_database_writer(self):
+        """Ждет окончания записи в базу (вызывается по таймеру в потоке Tk)"""
+        if self.database_writer.is_alive():
+            self.root.after(100, self.poll_database_writer)
+            return
+        writer, self.database_writer = self.database_writer, None
+        if writer.error:
+            # Вкладки остались на данных в памяти - хранение в базе выключается
+            self.use_database = False
+            self.database_var.set(False)
+            self.save_settings(use_database=False)
+            self.status_var.set(f"Ошибка записи в базу: {writer.error}")
+            return
+        self.finish_database()
+
+    def finish_database(self):
+        """Переводит вкладки на базу, если в ней есть оба листа"""
+        if not {"osfr", "ks"} <= set(self.open_database().sheets()):
+            self.status_var.set("База пуста - загрузите файл с номерами телефонов")
+            return
+        self.attach_database()
+        self.status_var.set(f"Справочник в базе {DB_FILE}")
+
+    def busy(self):
+        """Идет импорт или запись справочника в базу"""
+        return any(worker is not None and worker.is_alive() for worker in (self.import_worker, self.database_writer))
+
+    def start_watcher(self):
+        """
+        Слежение за последней импортированной книгой. Если она изменилась, пока программа
+        была закрыта, повторный импорт начнется при первой проверке.
+        """
+        self.watcher = FileWatcher(self.watch_interval, self.watch_settle)
+        settings = self.load_settings()
+        path = settings.get("last_workbook")
+        if path:
+            state = settings.get("state")
+            self.watcher.watch(path, tuple(state) if state else None)
+        self.watcher.start()
+        self.root.after(int(self.watch_interval * 1000), self.poll_watcher)
+
+    def toggle_auto_reload(self):
+        """Изменения, пропущенные при выключенном обновлении, импортируются после включения"""
+        if self.auto_reload_var.get() and self.watcher is not None:
+            self.watcher.rearm()
+
+    def poll_watcher(self):
+        """Изменения книги от watcher; пока идет импорт, повторный откладывается до его окончания"""
+        change = self.watcher.poll()
+        if change is not None and self.auto_reload_var.get():
+            self.reload_path = change[0]
+        if self.reload_path and not self.busy():
+            path, self.reload_path = self.reload_path, None
+            self.start_import(path, auto=True)
+        self.root.after(int(self.watch_interval * 1000), self.poll_watcher)
+
+    def cancel_import(self):
+        """Отмена фонового импорта"""
+        if self.import_worker and self.import_worker.is_alive():
+            self.import_worker.cancel()
+            self.status_var.set("Отмена импорта...")
 
     def create_widgets(self):
         """Создает виджеты для окна приложения"""
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
         # Создаем вкладки
         self.osfr_tab = Osfr(self.notebook)
@@ -568,8 +872,46 @@ class Window:
         self.notebook.add(self.client_service_tab.frame, text="Клиентские службы")
 
         # Загружаем начальные данные
+        self.load_initial_data()
+        self.start_watcher()
+
+    def open_database(self):
+        if self.database is None:
+            self.database = DirectoryDB(DB_FILE)
+        return self.database
+
+    def load_initial_data(self):
+        """Загрузка данных при запуске: из базы SQLite (use_database), снимка, а если их нет - из JSON-файлов"""
+        with tracer.operation("Загрузка"):
+            self.load_sheets()
+
+    def load_sheets(self):
+        if self.use_database and {"osfr", "ks"} <= set(self.open_database().sheets()):
+            self.attach_database()
+            return
+        try:
+            with span("load", source="snapshot"):
+                sheets = load_snapshot(SNAPSHOT_FILE)
+            osfr_data, ks_data = sheets.get("osfr", []), sheets.get("ks", [])
+        except (OSError, SnapshotError):
+            try:
+                with open('JSON/osfr.json', 'r', encoding='utf-8') as file:
+                    osfr_data = json.load(file)
+                with open('JSON/ks.json', 'r', encoding='utf-8') as file:
+                    ks_data = json.load(file)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Ошибка", f"Нет данных для отображения:\nЗагрузите файл с номерами телефонов")
+                print(str(e))
+                osfr_data, ks_data = [], []
+        self.set_sheets(osfr_data, ks_data)
+
+    def export_json(self):
+        """Экспорт текущих данных в JSON/osfr.json и JSON/ks.json"""
         try:
-            self.osfr_tab.load_data('JSON/osfr.json')
-            self.client_service_tab.load_data('JSON/ks.json')
-        except:
-            pass  # Если файла нет, просто пропускаем
\ No newline at end of file
+            if self.database is not None and not self.sheets:
+                export_to_json(list(self.database.query("ks")), list(self.database.query("osfr")))
+            else:
+                export_to_json(self.sheets.get(self.client_service_tab, []), self.sheets.get(self.osfr_tab, []))
+            self.status_var.set("Данные экспортированы в JSON/osfr.json и JSON/ks.json")
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить JSON:\n{str(e)}")
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Сравнение времени импорта книги: прежняя схема (каждый обработчик заново открывает
+книгу и читает каждый лист отдельно) и однопроходная загрузка IngestEngine.
+
+Запуск: python benchmarks/bench_import.py [число строк]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synth import make_workbook  # noqa: E402
+from class_tel_spr import SprKs, SprOsfr, load_xls  # noqa: E402
+
+
+def legacy_parser(filexls):
+    """Прежний ParserXls.parser: ExcelFile + отдельный read_excel на каждый лист"""
+    excel_file = pd.ExcelFile(filexls)
+    all_data = {}
+    for sheet_name in excel_file.sheet_names:
+        df = pd.read_excel(filexls, sheet_name=sheet_name).fillna('')
+        all_data[sheet_name] = df.to_dict(orient='records')
+    return all_data
+
+
+def legacy_format_tel(tel):
+    """Прежний ParserXls.format_tel: 6 цифр - xx-xx-xx, 5 цифр - x-xx-xx, остальное как есть"""
+    if not isinstance(tel, (str, int)):
+        return tel
+    tel_str = str(tel).strip()
+    digits = ''.join(filter(str.isdigit, tel_str))
+    if len(digits) == 6:
+        return f"{digits[0:2]}-{digits[2:4]}-{digits[4:]}"
+    elif len(digits) == 5:
+        return f"{digits[0:1]}-{digits[1:3]}-{digits[3:]}"
+    return tel_str
+
+
+def legacy_obrabotka(filexls, handler, phone_key, location_key, section=None):
+    """Прежние obrabotka_osfr/obrabotka_ks: разбор всей книги и построчный цикл по листам обработчика"""
+    list_strok = []
+    otdel = None
+    data = legacy_parser(filexls)
+    for sheet_name in data.keys():
+        if sheet_name not in handler.target_sheets:
+            continue
+        for row in data[sheet_name]:
+            if section is not None and section in str(row.get("Unnamed: 0", '')):
+                otdel = row.get("Unnamed: 0", '')
+            num_tel = str(row.get(phone_key, '')).strip()
+            if "-" not in num_tel and len(num_tel) > 0 and num_tel.isdigit():
+                row[phone_key] = legacy_format_tel(num_tel)
+            if row.get(location_key, '') != '':
+                new_row = {} if section is None else {'отдел': otdel}
+                for old_key, value in row.items():
+                    new_row[handler.target_map.get(old_key, old_key)] = str(value).strip()
+                list_strok.append(new_row)
+    return list_strok[1:] if len(list_strok) > 1 else list_strok
+
+
+def legacy_load(path_xls):
+    """
+    Прежний load_xls: SprKs и SprOsfr парсят книгу каждый сам, save_to_json разбирает
+    и обрабатывает ее повторно и пишет JSON
+    """
+    os.makedirs("JSON", exist_ok=True)
+    for handler, output_file, args in ((SprKs, "ks.json", ("Unnamed: 1", "Unnamed: 6", "Клиентская служба")),
+                                       (SprOsfr, "osfr.json", ("Unnamed: 0", "Unnamed: 8"))):
+        legacy_obrabotka(path_xls, handler, *args)
+        result = legacy_obrabotka(path_xls, handler, *args)
+        with open(os.path.join("JSON", output_file), 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_workbook(os.path.join(tmp, "spr.xlsx"), osfr_count=rows)
+        os.chdir(tmp)  # JSON/ пишется во временный каталог
+
+        before = best_of(lambda: legacy_load(path))
+        after = best_of(lambda: load_xls(path, cache=False))
+
+    print(f"Строк на листе ОСФР: {rows}")
+    print(f"До (каждый обработчик читает книгу): {before:.3f} с")
+    print(f"После (один проход IngestEngine):    {after:.3f} с")
+    print(f"Ускорение: x{before / after:.1f}")
+
+
+if __name__ == '__main__':
+    main()
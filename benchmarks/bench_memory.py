@@ -0,0 +1,54 @@
+"""
+Память под данные вкладки: список словарей после json.load (как раньше в BaseTab.original_data)
+против RecordStore (колонки с интернированными строками).
+
+Запуск: python benchmarks/bench_memory.py [число строк]
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth import osfr_rows  # noqa: E402
+from class_tel_spr import SprOsfr  # noqa: E402
+from record_store import RecordStore  # noqa: E402
+
+
+def osfr_records(count):
+    """Записи с ключами SprOsfr.target_map, как в osfr.json"""
+    columns = list(SprOsfr.target_map.values())
+    return [dict(zip(columns, ('' if value is None else str(value) for value in row)))
+            for row in list(osfr_rows(count))[1:] if row[8]]
+
+
+def measure(build):
+    """Прирост памяти, занятой результатом build(), в байтах"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    text = json.dumps(osfr_records(rows), ensure_ascii=False, indent=4)
+
+    dicts, dicts_size = measure(lambda: json.loads(text))
+    store, store_size = measure(lambda: RecordStore.from_dicts(json.loads(text)))
+    assert store.to_dicts() == dicts
+
+    print(f"Записей: {len(dicts)}")
+    print(f"Список словарей: {dicts_size / 1024 / 1024:.1f} МБ ({dicts_size // len(dicts)} байт на запись)")
+    print(f"RecordStore:     {store_size / 1024 / 1024:.1f} МБ ({store_size // len(dicts)} байт на запись)")
+    print(f"Экономия: x{dicts_size / store_size:.1f}")
+
+
+if __name__ == '__main__':
+    main()
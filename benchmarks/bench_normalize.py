@@ -0,0 +1,76 @@
+"""
+Обработка листов: прежний построчный цикл obrabotka_* против векторной обработки по колонкам
+(SprOsfr.normalize_frame / SprKs.normalize_frame) на синтетической книге.
+
+Запуск: python benchmarks/bench_normalize.py [число строк]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synth import ks_rows, osfr_rows  # noqa: E402
+from class_tel_spr import ParserXls, SprKs, SprOsfr  # noqa: E402
+
+
+def sheet_frame(rows):
+    """Лист в том виде, в каком его возвращает read_frames: колонки "Unnamed: N", пустые ячейки - ''"""
+    rows = list(rows)
+    width = max(len(row) for row in rows)
+    return pd.DataFrame(rows, columns=[f"Unnamed: {i}" for i in range(width)]).fillna('')
+
+
+def legacy_rows(records, target_map, phone_key, location_key, section=None):
+    """Прежний построчный цикл obrabotka_osfr/obrabotka_ks"""
+    list_strok = []
+    otdel = None
+    for row in records:
+        if section is not None and section in str(row.get("Unnamed: 0", '')):
+            otdel = row.get("Unnamed: 0", '')
+        num_tel = str(row.get(phone_key, '')).strip()
+        if "-" not in num_tel and len(num_tel) > 0 and num_tel.isdigit():
+            row[phone_key] = ParserXls.format_tel(None, num_tel)
+        if row.get(location_key, '') != '':
+            new_row = {} if section is None else {'отдел': otdel}
+            for old_key, value in row.items():
+                new_row[target_map.get(old_key, old_key)] = str(value).strip()
+            list_strok.append(new_row)
+    return list_strok[1:] if len(list_strok) > 1 else list_strok
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    osfr_df = sheet_frame(osfr_rows(rows))
+    ks_df = sheet_frame(ks_rows(rows))
+    osfr = SprOsfr(__file__, frames={"ОСФР": osfr_df})
+    ks = SprKs(__file__, frames={"Клиентские службы": ks_df})
+
+    # Прежний путь начинался со списка словарей (df.to_dict), его построение тоже входит в замер
+    old_osfr, old_osfr_time = timed(lambda: legacy_rows(osfr_df.to_dict(orient='records'), SprOsfr.target_map,
+                                                        "Unnamed: 0", "Unnamed: 8"))
+    old_ks, old_ks_time = timed(lambda: legacy_rows(ks_df.to_dict(orient='records'), SprKs.target_map,
+                                                    "Unnamed: 1", "Unnamed: 6", "Клиентская служба"))
+    new_osfr, new_osfr_time = timed(osfr.normalize_frame)
+    new_ks, new_ks_time = timed(ks.normalize_frame)
+
+    assert new_osfr.to_dict(orient='records') == old_osfr
+    assert new_ks.to_dict(orient='records') == old_ks
+
+    print(f"Строк на листе: {rows}")
+    print(f"ОСФР:              цикл {old_osfr_time:.3f} с, по колонкам {new_osfr_time:.3f} с "
+          f"(x{old_osfr_time / new_osfr_time:.1f})")
+    print(f"Клиентские службы: цикл {old_ks_time:.3f} с, по колонкам {new_ks_time:.3f} с "
+          f"(x{old_ks_time / new_ks_time:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Масштабирование параллельного импорта: чтение всех листов книги по листу на процесс
+(read_frames_parallel) и полный load_xls на 1/2/4/8 процессах. Результат сверяется с однопроцессным.
+
+Запуск: python benchmarks/bench_parallel.py [число строк] [число посторонних листов]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth import make_workbook  # noqa: E402
+from class_tel_spr import load_xls, pool_map, process_pool, read_frames  # noqa: E402
+
+WORKERS = (1, 2, 4, 8)
+
+
+def parse_sheet(filexls, sheet_name):
+    """Чтение одного листа (выполняется в процессе пула)"""
+    import pandas as pd
+
+    return pd.read_excel(filexls, sheet_name=sheet_name).fillna('')
+
+
+def read_frames_parallel(filexls, workers):
+    """
+    Вариант read_frames, в котором каждый лист читается в отдельном процессе
+    :return: словарь {имя листа: DataFrame} в порядке листов книги
+    """
+    import pandas as pd
+
+    with pd.ExcelFile(filexls) as excel_file:
+        names = excel_file.sheet_names
+    with process_pool(workers) as executor:
+        return pool_map(executor, parse_sheet, {name: (filexls, name) for name in names})
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def read_all(path, workers):
+    if workers == 1:
+        return read_frames(path)
+    return read_frames_parallel(path, workers)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    extra_sheets = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_workbook(os.path.join(tmp, "spr.xlsx"), osfr_count=rows, extra_sheets=extra_sheets)
+        snapshot = os.path.join(tmp, "directory.snap")
+
+        print(f"Строк на листе ОСФР: {rows}, листов в книге: {extra_sheets + 2}, ядер: {os.cpu_count()}")
+        print(f"{'процессов':>9} {'все листы, с':>14} {'load_xls, с':>12}")
+        base_frames = base_stores = None
+        for workers in WORKERS:
+            frames, read_time = timed(lambda: read_all(path, workers))
+            stores, load_time = timed(lambda: load_xls(path, cache=False, snapshot_path=snapshot,
+                                                       streaming=False, workers=workers))
+            if base_frames is None:
+                base_frames, base_stores = frames, stores
+            # Слияние детерминировано: порядок листов и строк тот же, что у одного процесса
+            assert list(frames) == list(base_frames)
+            assert all(frames[name].equals(base_frames[name]) for name in frames)
+            assert [store.to_dicts() for store in stores] == [store.to_dicts() for store in base_stores]
+            print(f"{workers:>9} {read_time:>14.3f} {load_time:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Нагрузочный тест службы поиска (server.py) на локальной машине: запросы /search и /phone
+по соединениям keep-alive, число запросов в секунду и задержки p50/p99.
+Первый проход - без кэша ответов, второй - те же запросы из кэша.
+
+Запуск: python benchmarks/bench_server.py [число строк] [число запросов] [число соединений]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth import SURNAMES, make_workbook  # noqa: E402
+from server import LookupService, build_directory  # noqa: E402
+
+
+def request_targets(directory, count, seed=1):
+    """Смесь запросов: фамилии, части фамилий и номера из справочника"""
+    rnd = random.Random(seed)
+    phones = [number for number in directory.sheets["osfr"].column("Городской номер") if number]
+    targets = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < 0.4:
+            targets.append("/search?q=" + quote(rnd.choice(SURNAMES)))
+        elif kind < 0.6:
+            targets.append("/search?q=" + quote(rnd.choice(SURNAMES)[:4]) + "&limit=20")
+        else:
+            targets.append("/phone/" + quote(rnd.choice(phones)))
+    return targets
+
+
+async def client(port, targets, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for target in targets:
+        start = time.perf_counter()
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load_test(service, targets, connections):
+    latencies = []
+    chunks = [targets[i::connections] for i in range(connections)]
+    port = service.server.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, chunk, latencies) for chunk in chunks))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000,
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000)
+
+
+def print_result(title, result):
+    rps, p50, p99 = result
+    print(f"{title:<18} {rps:>8.0f} запросов/с, p50 {p50:.2f} мс, p99 {p99:.2f} мс")
+
+
+async def run(path, requests, connections):
+    directory = build_directory(path)
+    service = LookupService(path, directory, reload_interval=0)
+    await service.start(port=0)
+    targets = request_targets(directory, requests)
+    print(f"Запросов: {requests}, соединений: {connections}, различных запросов: {len(set(targets))}")
+    service.cache.max_entries = 0
+    print_result("Без кэша ответов", await load_test(service, targets, connections))
+    service.cache.max_entries = len(targets)
+    await load_test(service, targets, connections)  # Прогрев кэша
+    print_result("Кэш ответов", await load_test(service, targets, connections))
+    service.server.close()
+    await service.server.wait_closed()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    connections = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_workbook(os.path.join(tmp, "spr.xlsx"), osfr_count=rows)
+        os.chdir(tmp)  # JSON/ пишется во временный каталог
+        asyncio.run(run(path, requests, connections))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Время загрузки данных при запуске окна: прежний путь (osfr.json/ks.json с indent=4 -> json.load
+-> RecordStore) против бинарного снимка directory.snap.
+
+Запуск: python benchmarks/bench_snapshot.py [число строк]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_memory import osfr_records  # noqa: E402
+from record_store import RecordStore  # noqa: E402
+from snapshot import load_snapshot, save_snapshot  # noqa: E402
+
+
+def best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return RecordStore.from_dicts(json.load(f))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    records = osfr_records(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "osfr.json")
+        snap_path = os.path.join(tmp, "directory.snap")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=4)
+        save_snapshot({"osfr": records}, snap_path)
+
+        assert load_snapshot(snap_path)["osfr"].to_dicts() == load_json(json_path).to_dicts()
+        json_time = best_of(lambda: load_json(json_path))
+        snap_time = best_of(lambda: load_snapshot(snap_path))
+        json_size = os.path.getsize(json_path)
+        snap_size = os.path.getsize(snap_path)
+
+    print(f"Записей: {len(records)}")
+    print(f"JSON (indent=4): {json_time * 1000:.1f} мс, {json_size / 1024:.0f} КБ")
+    print(f"Снимок:          {snap_time * 1000:.1f} мс, {snap_size / 1024:.0f} КБ")
+    print(f"Ускорение загрузки: x{json_time / snap_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
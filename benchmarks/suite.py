@@ -0,0 +1,175 @@
+"""
+Набор замеров справочника на синтетических книгах (benchmarks/synth.py) нескольких размеров:
+импорт книги, загрузка JSON и снимка, построение индекса, поиск и фильтр по подразделению -
+все без окна. Результаты пишутся в JSON, чтобы сравнивать их между коммитами.
+
+Запуск:
+    python benchmarks/suite.py                          # 1000, 10000 и 100000 строк
+    python benchmarks/suite.py --sizes 1000 10000 -o before.json
+    python benchmarks/suite.py --sizes 1000 10000 -o after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synth import SURNAMES, make_workbook  # noqa: E402
+from class_tel_spr import load_sheets  # noqa: E402
+from cli import search_engine  # noqa: E402
+from snapshot import SNAPSHOT_FILE, load_snapshot  # noqa: E402
+
+SIZES = (1000, 10000, 100000)
+SLOWER_THRESHOLD = 1.2  # Во сколько раз медленнее прежнего замер считается ухудшением
+
+
+def measure(func, repeat):
+    """Время выполнения func, с: медиана и минимум по repeat запускам"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "repeat": repeat}
+
+
+def search_queries(store, count=50, seed=1):
+    """Запросы, как их вводят в строку поиска: фамилии, начала фамилий, имя с фамилией, окончания номеров"""
+    rnd = random.Random(seed)
+    phones = [str(number) for number in store.column("Городской номер") if number]
+    queries = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < 0.3:
+            queries.append(rnd.choice(SURNAMES))
+        elif kind < 0.5:
+            queries.append(rnd.choice(SURNAMES)[:3])
+        elif kind < 0.7:
+            queries.append(f"{rnd.choice(SURNAMES)[:5]} {rnd.choice(('Ал', 'Ир', 'Се'))}")
+        else:
+            queries.append(rnd.choice(phones)[-4:])
+    return queries
+
+
+def typo(word, rnd):
+    """Слово с одной опечаткой (замена буквы)"""
+    i = rnd.randrange(len(word))
+    return word[:i] + rnd.choice("аеиоу") + word[i + 1:]
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_queries(engine, queries, dept=None, fuzzy=False):
+    for query in queries:
+        engine.query = None  # Каждый запрос считается заново, без уточнения прежнего результата
+        engine.update(query, dept, fuzzy)
+
+
+def bench_size(rows, repeat, workdir):
+    """Замеры для книги на rows строк листа "ОСФР": [{этап, строки, median, min, repeat}]"""
+    path = os.path.join(workdir, f"spr_{rows}.xlsx")
+    start = time.perf_counter()
+    make_workbook(path, osfr_count=rows)
+    print(f"{rows} строк: книга создана за {time.perf_counter() - start:.1f} с", file=sys.stderr)
+
+    results = []
+
+    def add(stage, func, stage_repeat=repeat, **extra):
+        result = measure(func, stage_repeat)
+        results.append(dict(stage=stage, rows=rows, **result, **extra))
+        print(f"  {stage:<22} {result['median'] * 1000:>10.1f} мс", file=sys.stderr)
+
+    # Первый импорт большой книги идет десятки секунд, поэтому при 100k строк он запускается один раз
+    import_repeat = repeat if rows < 100000 else 1
+    add("import", lambda: load_sheets(path, cache=False, export_json=True), import_repeat)
+    load_sheets(path)  # Заполняет кэш разбора
+    add("import_cached", lambda: load_sheets(path))
+    add("json_load", lambda: [load_json(os.path.join("JSON", name)) for name in ("osfr.json", "ks.json")])
+    add("snapshot_load", lambda: load_snapshot(SNAPSHOT_FILE))
+
+    store = load_snapshot(SNAPSHOT_FILE)["osfr"]
+    add("index", lambda: search_engine("osfr", store))
+    engine = search_engine("osfr", store)
+    queries = search_queries(store)
+    rnd = random.Random(2)
+    typos = [typo(rnd.choice(SURNAMES), rnd) for _ in range(20)]
+    departments = [dept for dept, _ in engine.departments()]
+    dept_sample = departments[::max(1, len(departments) // 20)]
+
+    add("search", lambda: run_queries(engine, queries), queries=len(queries))
+    add("search_fuzzy", lambda: run_queries(engine, typos, fuzzy=True), queries=len(typos))
+    add("dept_filter", lambda: [run_queries(engine, [""], dept) for dept in dept_sample], queries=len(dept_sample))
+    add("dept_search", lambda: [run_queries(engine, queries[:5], dept) for dept in dept_sample],
+        queries=5 * len(dept_sample))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Сравнение с прежним файлом результатов; возвращает число ухудшившихся замеров"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(item["stage"], item["rows"]): item["median"] for item in json.load(f)["results"]}
+    slower = 0
+    print(f"{'этап':<22} {'строк':>7} {'было, мс':>10} {'стало, мс':>10} {'x':>6}")
+    for item in results["results"]:
+        before = baseline.get((item["stage"], item["rows"]))
+        if before is None:
+            continue
+        ratio = item["median"] / before if before else float("inf")
+        mark = " медленнее" if ratio > SLOWER_THRESHOLD else ""
+        slower += bool(mark)
+        print(f"{item['stage']:<22} {item['rows']:>7} {before * 1000:>10.1f} {item['median'] * 1000:>10.1f} "
+              f"{ratio:>6.2f}{mark}")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры справочника на синтетических книгах")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="число строк листа ОСФР")
+    parser.add_argument("--repeat", type=int, default=3, help="число запусков каждого замера")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="файл результатов JSON")
+    parser.add_argument("--compare", help="прежний файл результатов для сравнения")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    results = {"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "python": platform.python_version(), "platform": platform.platform(),
+               "cpu_count": os.cpu_count(), "repeat": args.repeat, "results": []}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # JSON/ и кэш разбора пишутся во временный каталог
+        try:
+            for rows in args.sizes:
+                results["results"] += bench_size(rows, args.repeat, tmp)
+        finally:
+            os.chdir(cwd)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Результаты: {output}", file=sys.stderr)
+    if baseline:
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Генератор синтетических книг в формате справочника (листы "ОСФР" и "Клиентские службы")
+"""
+import random
+
+SURNAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов",
+            "Новиков", "Морозов", "Волков", "Алексеев", "Фёдоров", "Семёнов", "Егоров", "Павлов", "Орлов"]
+NAMES = ["Александр", "Алексей", "Андрей", "Елена", "Ирина", "Мария", "Наталья", "Ольга", "Сергей", "Татьяна"]
+PATRONYMICS = ["Александрович", "Алексеевич", "Андреевич", "Сергеевич", "Ивановна", "Петровна", "Сергеевна"]
+POSITIONS = ["Начальник отдела", "Заместитель начальника отдела", "Главный специалист-эксперт",
+             "Ведущий специалист-эксперт", "Специалист-эксперт", "Консультант"]
+LOCATIONS = ["ул. Ленина, 1", "ул. Советская, 25", "пр. Мира, 10"]
+CITIES = ["Абакан", "Саяногорск", "Черногорск", "Абаза", "Сорск", "Шира", "Белый Яр", "Таштып"]
+
+OSFR_HEADER = ["Городской номер", "Кор. тел.", "№ комн.", "ФАМИЛИЯ", "ИМЯ", "ОТЧЕСТВО", "ДОЛЖНОСТЬ", "Отдел",
+               "Место расположения"]
+KS_HEADER = ["КСПД", "Городской", "Фамилия", "Имя", "Отчество", "Должность", "Место расположения"]
+
+
+def city_phone(rnd):
+    """Городской номер в одном из встречающихся в книгах форматов"""
+    kind = rnd.random()
+    if kind < 0.45:
+        return rnd.randint(200000, 299999)  # 6 цифр числом
+    if kind < 0.7:
+        return rnd.randint(20000, 99999)  # 5 цифр числом
+    if kind < 0.82:
+        digits = str(rnd.randint(200000, 299999))
+        return f"{digits[0:2]}-{digits[2:4]}-{digits[4:]}"  # уже отформатирован
+    if kind < 0.9:
+        digits = str(rnd.randint(20000, 99999))
+        return f"{digits[0]}-{digits[1:3]}-{digits[3:]}"  # 5 цифр, уже отформатирован
+    return None
+
+
+def osfr_rows(count, seed=1):
+    """Строки листа "ОСФР": строка заголовков, затем отделы с сотрудниками"""
+    rnd = random.Random(seed)
+    yield OSFR_HEADER
+    row_no = 0
+    dept_no = 0
+    while row_no < count:
+        dept_no += 1
+        dept = f"Отдел {dept_no} по работе с обращениями"
+        yield [dept] + [None] * 8  # заголовок отдела (без места расположения)
+        for _ in range(rnd.randint(5, 25)):
+            if row_no >= count:
+                break
+            row_no += 1
+            yield [city_phone(rnd), rnd.randint(1000, 9999), rnd.randint(100, 599), rnd.choice(SURNAMES),
+                   rnd.choice(NAMES), rnd.choice(PATRONYMICS), rnd.choice(POSITIONS), dept,
+                   rnd.choice(LOCATIONS)]
+
+
+def ks_rows(count, seed=2):
+    """Строки листа "Клиентские службы": заголовки разделов "Клиентская служба ..." и сотрудники"""
+    rnd = random.Random(seed)
+    yield KS_HEADER
+    row_no = 0
+    section_no = 0
+    while row_no < count:
+        city = CITIES[section_no % len(CITIES)]
+        section_no += 1
+        yield [f"Клиентская служба (на правах отдела) в г. {city} №{section_no}"] + [None] * 6
+        for _ in range(rnd.randint(3, 15)):
+            if row_no >= count:
+                break
+            row_no += 1
+            yield [rnd.randint(1000, 9999), city_phone(rnd), rnd.choice(SURNAMES), rnd.choice(NAMES),
+                   rnd.choice(PATRONYMICS), rnd.choice(POSITIONS), f"г. {city}, {rnd.choice(LOCATIONS)}"]
+
+
+def make_workbook(path, osfr_count=1000, ks_count=None, extra_sheets=2):
+    """
+    Создает книгу справочника
+    :param path: куда сохранить .xlsx
+    :param osfr_count: число сотрудников на листе "ОСФР"
+    :param ks_count: число сотрудников на листе "Клиентские службы" (по умолчанию половина osfr_count)
+    :param extra_sheets: число посторонних листов, которые обработчикам не нужны
+    :return: path
+    """
+    import openpyxl
+
+    if ks_count is None:
+        ks_count = osfr_count // 2
+
+    wb = openpyxl.Workbook(write_only=True)
+    sheets = [("ОСФР", osfr_rows(osfr_count)), ("Клиентские службы", ks_rows(ks_count))]
+    sheets += [(f"Справочно {i + 1}", osfr_rows(osfr_count // 2, seed=10 + i)) for i in range(extra_sheets)]
+    for title, rows in sheets:
+        ws = wb.create_sheet(title)
+        ws.append([])  # первая строка пустая - pandas дает колонки "Unnamed: N"
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+    return path
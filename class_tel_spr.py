@@ -1,15 +1,261 @@
 import json
+import logging
 import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from itertools import chain
 
-import pandas as pd
+from parse_cache import ParseCache
+from phone_format import PHONES, format_phone
+from profiling import span
+from record_store import RecordStore
+from snapshot import SNAPSHOT_FILE, save_snapshot, snapshot_key
+
+PARSER_VERSION = 4  # Увеличивать при любом изменении результата разбора (сбрасывает кэш)
+STREAMING_MIN_SIZE = 20 * 1024 * 1024  # Книги от этого размера по умолчанию читаются потоково
+# Число процессов для run_parallel, если оно не указано. Параллельный импорт
+# включается только явно (workers > 1): на одном ядре пул процессов медленнее обычного импорта
+IMPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+HANDLERS = []  # Зарегистрированные обработчики листов
+
+logger = logging.getLogger(__name__)
+
+
+def register_handler(cls):
+    """Регистрирует класс-обработчик листов для общей загрузки книги"""
+    if cls not in HANDLERS:
+        HANDLERS.append(cls)
+    return cls
+
+
+class ImportCancelled(Exception):
+    """Импорт книги отменен пользователем"""
+
+
+def check_cancel(cancel):
+    """Прерывает импорт, если установлен флаг отмены (threading.Event)"""
+    if cancel is not None and cancel.is_set():
+        raise ImportCancelled("Импорт отменен")
+
+
+def report(progress, text, percent):
+    """Передает состояние импорта в функцию progress(text, percent), если она задана"""
+    if progress is not None:
+        progress(text, percent)
+
+
+def read_frames(filexls, sheet_names=None, progress=None, cancel=None):
+    """
+    Открывает книгу один раз и читает только нужные листы
+    :param filexls: путь к Excel-файлу
+    :param sheet_names: список нужных листов (None - все листы)
+    :param progress: функция progress(text, percent) для отображения хода чтения
+    :param cancel: threading.Event, проверяется между листами
+    :return: словарь {имя листа: DataFrame}, пустые ячейки заменены на ''
+    """
+    # pandas загружается только при импорте книги, чтобы не замедлять запуск окна
+    import pandas as pd
+
+    frames = {}
+    report(progress, "Открытие книги", 0)
+    with span("open"):
+        excel_file = pd.ExcelFile(filexls)
+    with excel_file:
+        names = [name for name in excel_file.sheet_names
+                 if sheet_names is None or name in sheet_names]
+        # Все листы разбираются по уже открытой книге, без повторного открытия файла
+        for number, sheet_name in enumerate(names):
+            check_cancel(cancel)
+            report(progress, f"Чтение листа \"{sheet_name}\"", 5 + 65 * number // len(names))
+
+            # Замена NaN на пустые строки для корректного JSON
+            with span("parse", sheet=sheet_name):
+                frames[sheet_name] = excel_file.parse(sheet_name=sheet_name).fillna('')
+    return frames
+
+
+def process_pool(workers):
+    """
+    Пул процессов импорта. Процессы запускаются через spawn: импорт идет из фонового потока
+    при работающем Tk, а fork многопоточного процесса небезопасен
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+
+
+def pool_map(executor, func, tasks, cancel=None, on_done=None):
+    """
+    Выполняет func(*args) для каждой задачи {ключ: args} в пуле процессов
+    :param on_done: функция on_done(ключ, готово, всего) после завершения каждой задачи
+    :return: словарь {ключ: результат} в порядке ключей tasks, а не в порядке завершения задач
+    """
+    futures = {executor.submit(func, *args): key for key, args in tasks.items()}
+    results = {}
+    pending = set(futures)
+    while pending:
+        # Короткий таймаут, чтобы отмена срабатывала, не дожидаясь долгого листа
+        done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+        check_cancel(cancel)
+        for future in done:
+            results[futures[future]] = future.result()
+            if on_done is not None:
+                on_done(futures[future], len(results), len(futures))
+    return {key: results[key] for key in tasks}
+
+
+def terminate_pool(executor):
+    """
+    Остановка пула без ожидания: задачи из очереди снимаются, работающие процессы завершаются.
+    Нужна при отмене - иначе shutdown ждет, пока процессы дочитают свои листы
+    """
+    # Публичного способа завершить процессы пула нет (terminate_workers появился только в Python 3.14)
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def frames_to_records(frames):
+    """Листы как списки словарей: {имя листа: список строк}"""
+    return {sheet_name: df.to_dict(orient='records') for sheet_name, df in frames.items()}
+
+
+def save_all_sheets(all_data, output_dir="JSON", output_file="all_sheets.json"):
+    """Сохраняет прочитанные листы в JSON"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    json_path = os.path.join(output_dir, output_file)
+
+    with span("serialize", file=output_file), open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(all_data, f, ensure_ascii=False, indent=2)
+
+
+def read_sheets(filexls, sheet_names=None, output_dir="JSON", output_file="all_sheets.json",
+                progress=None, cancel=None):
+    """
+    Читает нужные листы книги в виде списков словарей
+    :param output_file: копия прочитанных листов в JSON (None - не сохранять)
+    :return: словарь {имя листа: список строк}
+    """
+    all_data = frames_to_records(read_frames(filexls, sheet_names, progress, cancel))
+    if output_file:
+        save_all_sheets(all_data, output_dir, output_file)
+    return all_data
+
+
+def format_tel_column(column):
+    """
+    format_tel для колонки: номера форматируются по правилам PHONE_RULES,
+    остальные значения возвращаются как str(значение).strip()
+    """
+    # Повторяющиеся номера берутся из кэша PHONES, каждое значение разбирается один раз
+    return column.map(format_phone)
+
+
+def frame_to_store(df):
+    """DataFrame -> RecordStore без промежуточных словарей на каждую строку"""
+    return RecordStore.from_columns(
+        [str(column) for column in df.columns],
+        [[sys.intern(value) if type(value) is str else value for value in df[column].tolist()]
+         for column in df.columns])
+
+
+def iter_sheet_rows(workbook, sheet_name, width=0, cancel=None):
+    """
+    Потоковое чтение листа книги, открытой в режиме только для чтения (openpyxl, read_only=True).
+    Строки выдаются по одной в том же виде, что и у pandas: первая строка листа - заголовки,
+    пустые заголовки дают ключи "Unnamed: N", пустые ячейки - '', целые числа - int.
+    :param width: минимальное число колонок (строки дополняются пустыми ячейками)
+    """
+    sheet = workbook[sheet_name]
+    width = max(width, sheet.max_column or 0)
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = tuple(header) + (None,) * (width - len(header))
+    columns = [f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(header)]
+    for number, values in enumerate(rows):
+        if number % 1000 == 0:
+            check_cancel(cancel)
+        if all(value is None for value in values):
+            continue  # pandas пропускает пустые строки
+        if len(values) > len(columns):
+            columns += [f"Unnamed: {i}" for i in range(len(columns), len(values))]
+        row = {}
+        for position, column in enumerate(columns):
+            value = values[position] if position < len(values) else None
+            if value is None:
+                value = ''
+            elif isinstance(value, float) and value.is_integer():
+                value = int(value)
+            row[column] = value
+        yield row
+
+
+def drop_header_record(records):
+    """Потоковый вариант drop_header_row: первая запись отбрасывается, если за ней есть другие"""
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return
+    second = next(records, None)
+    if second is None:
+        yield first
+        return
+    yield second
+    yield from records
+
+
+def stream_xls(path_xls, handlers, progress=None, cancel=None):
+    """
+    Потоковый импорт: строки целевых листов читаются по одной и проходят через
+    iter_records обработчика (нормализация -> фильтр -> переименование) прямо в RecordStore,
+    поэтому пиковая память не зависит от числа строк в книге.
+    :return: словарь {класс обработчика: RecordStore}
+    """
+    import openpyxl
+
+    report(progress, "Открытие книги", 0)
+    with span("open", streaming=True):
+        workbook = openpyxl.load_workbook(path_xls, read_only=True, data_only=True)
+    try:
+        stores = {}
+        for number, handler in enumerate(handlers):
+            check_cancel(cancel)
+            report(progress, f"Чтение листов {', '.join(handler.target_sheets)}", 5 + 85 * number // len(handlers))
+            rows = chain.from_iterable(iter_sheet_rows(workbook, sheet_name, len(handler.target_map), cancel)
+                                       for sheet_name in workbook.sheetnames
+                                       if sheet_name in handler.target_sheets)
+            # Чтение и обработка строк идут вместе, этап замеряется целиком
+            with span("parse+normalize", handler=handler.__name__):
+                stores[handler] = RecordStore.from_stream(handler(path_xls).iter_records(rows))
+        return stores
+    finally:
+        workbook.close()
 
 
 class ParserXls:
-    def __init__(self, filexls):
+    """
+    Обработчик листов книги. Подкласс описывает лист декларативно атрибутами класса,
+    разбор и нормализация (по колонкам - normalize_frame, потоково - iter_records) общие.
+    """
+    key = None  # Имя данных обработчика в снимке, кэше и вкладках окна ("osfr", "ks")
+    target_sheets = None  # Листы, которые нужно прочитать (None - все листы книги)
+    target_map = {}  # Переименование колонок листа
+    phone_columns = ()  # Колонки с номерами телефонов, которые нужно отформатировать
+    required_column = None  # Фильтр строк: строки с пустым значением в этой колонке отбрасываются
+    section_rule = None  # Заголовки разделов: (колонка, текст-признак, новая колонка для значения заголовка)
+    output_file = None  # Файл для save_to_json
+
+    def __init__(self, filexls, all_data=None, frames=None):
         if not os.path.exists(filexls):
             raise FileNotFoundError(f"Файл {filexls} не найден")
         self.filexls = filexls
-        self.all_data = {}
+        self.all_data = all_data or {}
+        self.frames = frames
 
 
     def __str__(self):
@@ -23,53 +269,130 @@ class ParserXls:
         :return:
         """
         if not self.all_data:  # Парсим только если данные еще не загружены
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-
-            excel_file = pd.ExcelFile(self.filexls)
-            sheet_names = excel_file.sheet_names
-
-            all_data = {}
-
-            for sheet_name in sheet_names:
-                df = pd.read_excel(self.filexls, sheet_name=sheet_name)
-
-                # Замена NaN на пустые строки для корректного JSON
-                df = df.fillna('')
-
-                # Сохраняем данные листа как список словарей
-                all_data[sheet_name] = df.to_dict(orient='records')
-
-            json_path = os.path.join(output_dir, output_file)
-
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(all_data, f, ensure_ascii=False, indent=2)
-
-            self.all_data = all_data
+            if self.frames is not None:
+                self.all_data = frames_to_records(self.frames)
+            else:
+                self.all_data = read_sheets(self.filexls, self.target_sheets, output_dir, output_file)
         return self.all_data
 
+    def get_frames(self):
+        """Листы книги в виде DataFrame (книга читается один раз)"""
+        if self.frames is None:
+            import pandas as pd
+
+            if self.all_data:
+                self.frames = {name: pd.DataFrame(rows) for name, rows in self.all_data.items()}
+            else:
+                self.frames = read_frames(self.filexls, self.target_sheets)
+        return self.frames
+
+    def target_frame(self):
+        """Строки всех целевых листов одной таблицей (в порядке листов книги)"""
+        import pandas as pd
+
+        frames = [df for name, df in self.get_frames().items()
+                  if self.target_sheets is None or name in self.target_sheets]
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True).fillna('')
+
+    @staticmethod
+    def clean_frame(df, target_map, phone_columns, location_column):
+        """
+        Общая векторная обработка листа:
+        номера в phone_columns форматируются, строки без location_column отбрасываются,
+        значения приводятся к строкам без пробелов по краям, колонки переименовываются по target_map
+        """
+        if location_column not in df.columns:
+            return df.iloc[0:0].rename(columns=target_map)
+        mask = df[location_column] != ''
+        out = df[mask].copy()
+        for column in out.columns:
+            if column in phone_columns:
+                out[column] = format_tel_column(out[column])
+            else:
+                out[column] = out[column].astype(str).str.strip()
+        return out.rename(columns=target_map)
+
+    @staticmethod
+    def drop_header_row(df):
+        """Первая подходящая строка - заголовки колонок листа"""
+        return df.iloc[1:] if len(df) > 1 else df
+
+    def section_column(self, df):
+        """Значение последнего заголовка раздела для каждой строки таблицы (None - до первого заголовка)"""
+        column, marker, _ = self.section_rule
+        if column not in df.columns:
+            return None
+        values = df[column]
+        section = values.where(values.astype(str).str.contains(marker, regex=False)).ffill()
+        return section.astype(object).where(section.notna(), None)
+
+    def normalize_frame(self):
+        """Обработка целевых листов целиком по колонкам"""
+        df = self.target_frame()
+        section = self.section_column(df) if self.section_rule else None
+        df = self.clean_frame(df, self.target_map, self.phone_columns, self.required_column)
+        if self.section_rule:
+            # Заголовок раздела берется как есть (без приведения к строке), колонка идет первой
+            df.insert(0, self.section_rule[2], section[df.index] if section is not None else None)
+        return self.drop_header_row(df)
+
+    def obrabotka(self):
+        """Обработанные строки в виде списка словарей"""
+        return self.normalize_frame().to_dict(orient='records')
+
+    def iter_records(self, rows):
+        """Потоковая обработка строк целевых листов (см. stream_xls), результат совпадает с normalize_frame"""
+        return drop_header_record(self.iter_rows(rows))
+
+    def iter_rows(self, rows):
+        section = None
+        for row in rows:
+            if self.section_rule:
+                column, marker, _ = self.section_rule
+                value = row.get(column, '')
+                if marker in str(value):
+                    section = value
+            if row.get(self.required_column, '') == '':
+                continue
+            if self.section_rule:
+                new_row = {self.section_rule[2]: section}
+                new_row.update(self.normalize_row(row))
+                yield new_row
+            else:
+                yield self.normalize_row(row)
+
+    def normalize_row(self, row):
+        """Построчная обработка: форматирование номеров, значения - строки без пробелов, ключи по target_map"""
+        for column in self.phone_columns:
+            if column in row:
+                row[column] = format_phone(row[column])
+        return {self.target_map.get(key, key): str(value).strip() for key, value in row.items()}
+
     def format_tel(self, tel):
-        """Форматирование телефонного номера"""
+        """Форматирование телефонного номера (см. phone_format.PHONE_RULES)"""
         if not isinstance(tel, (str, int)):
             return tel
+        return format_phone(tel)
 
-        tel_str = str(tel).strip()
-
-        # Убираем все нецифровые символы
-        digits = ''.join(filter(str.isdigit, tel_str))
-
-        if len(digits) == 6:
-            return f"{digits[0:2]}-{digits[2:4]}-{digits[4:]}"
-        elif len(digits) == 5:
-            return f"{digits[0:1]}-{digits[1:3]}-{digits[3:]}"
-        else:
-            return tel_str  # Возвращаем как есть, если не подходит под форматы
+    def save_to_json(self, output_dir="JSON", output_file=None, result=None):
+        """
+        Сохраняет обработанные строки в JSON файл (по умолчанию - output_file обработчика)
+        """
+        if result is None:
+            result = self.obrabotka()
+        save_json(result, output_dir, output_file or self.output_file)
 
 
+@register_handler
 class SprOsfr(ParserXls):
     """
     Класс для обработки Excel-файла с выделением нужных листов.
     """
+    key = "osfr"
     target_sheets = ["ОСФР"]  # Листы, которые нужно обработать
     target_map = {
         'Unnamed: 0': 'Городской номер',
@@ -82,54 +405,17 @@ class SprOsfr(ParserXls):
         'Unnamed: 7': 'Отдел',
         'Unnamed: 8': 'Место расположения'
     }
-
-    def __init__(self, filexls):
-        super().__init__(filexls)
-        self.osfr = None
+    phone_columns = ("Unnamed: 0",)
+    required_column = "Unnamed: 8"
+    output_file = 'osfr.json'
 
     def obrabotka_osfr(self):
-        list_strok = []
-        data = self.parser()
-        for sheet_name in data.keys():
-            if sheet_name in self.target_sheets:
-                # print(sheet_name)
-                for row in data[sheet_name]:
-
-                    # # ---------------------------------------------------------------------------------------------------------
-                    num_tel = row.get("Unnamed: 0", '')
-                    num_tel = str(num_tel).strip()
-                    if "-" not in num_tel and len(num_tel) > 0 and num_tel.isdigit():
-                        num_tel = self.format_tel(num_tel)
-                        row["Unnamed: 0"] = num_tel
-                    # # ---------------------------------------------------------------------------------------------------------
-
-                    if row.get("Unnamed: 8", '') != '':
-                        # Создаем новую строку с замененными ключами
-                        new_row = {}
-                        for old_key, value in row.items():
-                            # Если ключ есть в target_map, используем новое название, иначе оставляем старый
-                            new_key = self.target_map.get(old_key, old_key)
-                            new_row[new_key] = str(value).strip()
-                        list_strok.append(new_row)
-        if len(list_strok) > 1:
-            list_strok_ = list_strok[1:]
-        else:
-            list_strok_ = list_strok
-
-        return list_strok_
-
-    def save_to_json(self, output_dir="JSON", output_file='osfr.json'):
-        """
-        Сохраняет результат obrabotka_osfr в JSON файл
-        """
-        json_path = os.path.join(output_dir, output_file)
-        result = self.obrabotka_osfr()
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=4)
-        print(f"Данные успешно записаны в {json_path}")
+        return self.obrabotka()
 
 
+@register_handler
 class SprKs(ParserXls):
+    key = "ks"
     target_sheets = ["Клиентские службы",]  # Листы, которые нужно обработать
     target_map = {
         "Unnamed: 0": "кспд",
@@ -140,76 +426,236 @@ class SprKs(ParserXls):
         "Unnamed: 5": "Должность",
         "Unnamed: 6": "Место расположения",
     }
-
-    def __init__(self, filexls):
-        super().__init__(filexls)
-        self.ks = None
+    phone_columns = ("Unnamed: 1",)
+    required_column = "Unnamed: 6"
+    # Строка-заголовок раздела задает отдел для всех следующих строк
+    section_rule = ("Unnamed: 0", "Клиентская служба", "отдел")
+    output_file = 'ks.json'
 
     def obrabotka_ks(self):
-        list_strok = []
-        otdel = None
-        required_chars = "Клиентская служба"
-        data = self.parser()
-
-        for sheet_name in data.keys():
-            if sheet_name in self.target_sheets:
-                for row in data[sheet_name]:
-                    value = row.get("Unnamed: 0", '')
-                    if required_chars in str(value):
-                        otdel = value
-
-                    # ---------------------------------------------------------------------------------------------------------
-                    num_tel = row.get("Unnamed: 1", '')
-                    num_tel = str(num_tel).strip()
-                    if "-" not in num_tel and len(num_tel) > 0 and num_tel.isdigit():
-                        num_tel = self.format_tel(num_tel)
-                        row["Unnamed: 1"] = num_tel
-                    # ---------------------------------------------------------------------------------------------------------
-
-                    if row.get("Unnamed: 6", '') != '':
-                        # Создаем новую строку с замененными ключами
-                        new_row = {}
-                        new_row['отдел'] = otdel
-                        for old_key, value in row.items():
-                            new_key = self.target_map.get(old_key, old_key)
-                            new_row[new_key] = str(value).strip()
-
-                        list_strok.append(new_row)
-        if len(list_strok) > 1:
-            list_strok_ = list_strok[1:]
-        else:
-            list_strok_ = list_strok
-
-        return list_strok_
-
-    def save_to_json(self, output_dir="JSON", output_file='ks.json'):
+        return self.obrabotka()
+
+
+class IngestEngine:
+    """
+    Загрузка книги за один проход для всех зарегистрированных обработчиков
+    """
+
+    def __init__(self, filexls, handlers=None):
+        if not os.path.exists(filexls):
+            raise FileNotFoundError(f"Файл {filexls} не найден")
+        self.filexls = filexls
+        self.handlers = list(handlers if handlers is not None else HANDLERS)
+
+    def target_sheets(self):
+        """Объединенный список листов, нужных обработчикам (None - нужны все листы)"""
+        sheets = []
+        for handler in self.handlers:
+            if handler.target_sheets is None:
+                return None
+            for sheet_name in handler.target_sheets:
+                if sheet_name not in sheets:
+                    sheets.append(sheet_name)
+        return sheets
+
+    def run(self, output_dir="JSON", output_file="all_sheets.json", progress=None, cancel=None):
+        """
+        Читает книгу один раз и передает данные листов каждому обработчику
+        :return: словарь {класс обработчика: экземпляр с загруженными данными}
+        """
+        frames = read_frames(self.filexls, self.target_sheets(), progress, cancel)
+        if output_file:
+            save_all_sheets(frames_to_records(frames), output_dir, output_file)
+        return {handler: handler(self.filexls, frames=frames) for handler in self.handlers}
+
+    def process(self, output_dir="JSON", output_file="all_sheets.json", progress=None, cancel=None):
+        """
+        Чтение книги за один проход (run) и обработка листов каждым обработчиком в текущем процессе
+        :return: словарь {класс обработчика: RecordStore}
+        """
+        parsers = self.run(output_dir, output_file, progress, cancel)
+        stores = {}
+        for number, (handler, parser) in enumerate(parsers.items()):
+            check_cancel(cancel)
+            report(progress, f"Обработка: {handler.__name__}", 70 + 20 * number // len(parsers))
+            with span("normalize", handler=handler.__name__):
+                stores[handler] = frame_to_store(parser.normalize_frame())
+        return stores
+
+
+    def run_parallel(self, workers=IMPORT_WORKERS, output_dir="JSON", output_file="all_sheets.json",
+                     progress=None, cancel=None):
         """
-        Сохраняет результат obrabotka_osfr в JSON файл
+        Параллельный вариант process: каждый обработчик читает свои листы и нормализует их
+        в отдельном процессе, DataFrame между процессами не передаются.
+        Процессов не больше, чем обработчиков. Результаты собираются в порядке списка обработчиков,
+        поэтому не зависят от того, какой процесс закончил раньше.
+        :return: словарь {класс обработчика: RecordStore}
         """
-        json_path = os.path.join(output_dir, output_file)
-        result = self.obrabotka_ks()
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=4)
-        print(f"Данные успешно записаны в {json_path}")
+        report(progress, "Чтение и обработка листов", 5)
+
+        def on_done(handler, done, total):
+            report(progress, f"Обработан: {handler.__name__}", 5 + 85 * done // total)
+
+        tasks = {handler: (handler, self.filexls, bool(output_file)) for handler in self.handlers}
+        executor = process_pool(min(workers, len(tasks)))
+        try:
+            with span("parse+normalize", workers=min(workers, len(tasks)), handlers=len(tasks)):
+                results = pool_map(executor, process_handler, tasks, cancel, on_done)
+        except BaseException:
+            terminate_pool(executor)  # Отмена или ошибка - процессы больше не нужны
+            raise
+        executor.shutdown()
+
+        if output_file:
+            import pandas as pd
+
+            # Листы, общие для нескольких обработчиков, записываются один раз, в порядке листов книги
+            records = {}
+            for _, handler_records in results.values():
+                records.update(handler_records)
+            with pd.ExcelFile(self.filexls) as excel_file:
+                save_all_sheets({name: records[name] for name in excel_file.sheet_names if name in records},
+                                output_dir, output_file)
+        return {handler: RecordStore.from_columns(*columns) for handler, (columns, _) in results.items()}
+
+
+def process_handler(handler, filexls, with_records=False):
+    """
+    Чтение листов обработчика и их нормализация (выполняется в процессе пула, см. IngestEngine.run_parallel)
+    :param with_records: вернуть и прочитанные листы списками словарей (для all_sheets.json)
+    :return: (колонки RecordStore, {имя листа: список строк})
+    """
+    frames = read_frames(filexls, handler.target_sheets)
+    columns = frame_to_store(handler(filexls, frames=frames).normalize_frame()).to_columns()
+    return columns, frames_to_records(frames) if with_records else {}
+
 
+def save_json(data, output_dir="JSON", output_file="osfr.json"):
+    """Записывает обработанные строки в JSON файл"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    json_path = os.path.join(output_dir, output_file)
+    with span("serialize", file=output_file), open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    logger.info("Данные успешно записаны в %s", json_path)
 
-def load_xls(path_xls):
+
+def export_sheets(sheets, output_dir="JSON", handlers=None):
+    """Экспорт обработанных данных: лист каждого обработчика - в его output_file"""
+    for handler in handlers if handlers is not None else HANDLERS:
+        if handler.key in sheets:
+            save_json(RecordStore.from_dicts(sheets[handler.key]).to_dicts(), output_dir, handler.output_file)
+
+
+def export_to_json(ks_data, osfr_data, output_dir="JSON"):
+    """Экспорт обработанных данных в ks.json и osfr.json"""
+    export_sheets({"ks": ks_data, "osfr": osfr_data}, output_dir)
+
+
+def save_database(sheets, database, key):
+    """Запись листов в базу SQLite (sqlite_store.DirectoryDB) одной транзакцией"""
+    from sqlite_store import DirectoryDB
+
+    db = DirectoryDB(database)
     try:
-        # Создаем объект один раз для каждого типа
-        ks = SprKs(path_xls)
-        ks_data = ks.obrabotka_ks()  # Получаем данные
-        ks.save_to_json()  # Сохраняем
+        if db.source_key() != key:
+            with span("serialize", file=database):
+                db.write_sheets(sheets, key)
+    finally:
+        db.close()
 
-        osfr = SprOsfr(path_xls)
-        osfr_data = osfr.obrabotka_osfr()
-        osfr.save_to_json(output_file='osfr.json')
 
-        print("Обработка завершена успешно!")
-        return ks_data, osfr_data  # Возвращаем данные для дальнейшего использования
+def load_sheets(path_xls, handlers=None, cache=None, progress=None, cancel=None, export_json=False,
+                snapshot_path=SNAPSHOT_FILE, streaming=None, workers=None, database=None):
+    """
+    Разбор книги всеми обработчиками за один проход и сохранение результата в снимок справочника
+    :param path_xls: путь к Excel-файлу
+    :param handlers: классы-обработчики листов (по умолчанию - все зарегистрированные, HANDLERS)
+    :param cache: ParseCache (по умолчанию - кэш в JSON/cache), False - не использовать кэш
+    :param progress: функция progress(text, percent) для отображения хода импорта
+    :param cancel: threading.Event для отмены импорта (выбрасывается ImportCancelled)
+    :param export_json: дополнительно записать all_sheets.json и output_file каждого обработчика
+    :param snapshot_path: файл снимка, который читает окно при запуске
+    :param streaming: потоковое чтение без pandas (None - для книг от STREAMING_MIN_SIZE);
+        all_sheets.json в этом режиме не пишется
+    :param workers: число процессов для чтения листов и обработки (None или 1 - в текущем процессе,
+        больше 1 - по процессу на обработчик); потоковое чтение всегда идет в одном процессе
+    :param database: файл базы SQLite, которую нужно заполнить (None - без базы)
+    :return: словарь {key обработчика: RecordStore}
+    """
+    handlers = list(handlers if handlers is not None else HANDLERS)
+    if cache is None:
+        cache = ParseCache()
+    report(progress, "Проверка кэша", 0)
+    # Результат зависит и от набора обработчиков (но не от их порядка), и от правил форматирования номеров
+    with span("cache"):
+        version = "-".join([str(PARSER_VERSION), PHONES.digest] + sorted(h.key for h in handlers))
+        key = (cache or ParseCache()).make_key(path_xls, version)
+        sheets = cache.get(key) if cache else None
+    if sheets is not None:
+        if snapshot_key(snapshot_path) != key:
+            with span("serialize", file=snapshot_path):
+                save_snapshot(sheets, snapshot_path, key)
+        if database:
+            save_database(sheets, database, key)
+        if export_json:
+            export_sheets(sheets, handlers=handlers)
+        report(progress, "Данные взяты из кэша", 100)
+        logger.info("Данные взяты из кэша")
+        return sheets
+
+    if streaming is None:
+        streaming = os.path.getsize(path_xls) >= STREAMING_MIN_SIZE
+
+    output_file = "all_sheets.json" if export_json else None
+    if streaming:
+        stores = stream_xls(path_xls, handlers, progress, cancel)
+    elif workers and workers > 1:
+        stores = IngestEngine(path_xls, handlers).run_parallel(workers, output_file=output_file,
+                                                               progress=progress, cancel=cancel)
+    else:
+        # Книга читается один раз, данные листов получают все обработчики
+        stores = IngestEngine(path_xls, handlers).process(output_file=output_file, progress=progress,
+                                                          cancel=cancel)
+    sheets = {handler.key: stores[handler] for handler in handlers}
+
+    # Файлы пишутся только после полной обработки, отмена не оставляет их наполовину обновленными
+    check_cancel(cancel)
+    report(progress, "Сохранение", 90)
+    with span("serialize", file=snapshot_path):
+        save_snapshot(sheets, snapshot_path, key)
+    if database:
+        save_database(sheets, database, key)
+    if export_json:
+        export_sheets(sheets, handlers=handlers)
+
+    if cache:
+        with span("cache", put=True):
+            cache.put(key, sheets)
+
+    report(progress, "Обработка завершена", 100)
+    logger.info("Обработка завершена успешно!")
+    return sheets
+
+
+def load_xls(path_xls, cache=None, progress=None, cancel=None, export_json=False, snapshot_path=SNAPSHOT_FILE,
+             streaming=None, workers=None, database=None):
+    """
+    Загрузка листов ОСФР и клиентских служб (параметры - см. load_sheets)
+    :return: (RecordStore клиентских служб, RecordStore ОСФР)
+    """
+    try:
+        sheets = load_sheets(path_xls, [SprKs, SprOsfr], cache, progress, cancel, export_json, snapshot_path,
+                             streaming, workers, database)
+        return sheets["ks"], sheets["osfr"]  # Возвращаем данные для дальнейшего использования
 
+    except ImportCancelled:
+        logger.warning("Импорт отменен")
+        raise
     except FileNotFoundError as e:
-        print(f"Ошибка: {e}")
+        logger.error("Ошибка: %s", e)
         return None, None
     except Exception as e:
-        print(f"Неожиданная ошибка: {e}")
-        return None, None
\ No newline at end of file
+        logger.exception("Неожиданная ошибка: %s", e)
+        return None, None
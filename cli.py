@@ -0,0 +1,179 @@
+"""
+Телефонный справочник без окна: импорт книги, поиск и пакетное определение владельцев номеров.
+
+    python cli.py import справочник.xlsx
+    python cli.py query Иванов
+    python cli.py query "8 (800) 12-34-56"
+    python cli.py resolve звонки.csv --delimiter , --column 2 -o звонки_с_именами.csv
+"""
+import argparse
+import csv
+import logging
+import sys
+import time
+from functools import lru_cache
+
+from search import PHONE_QUERY, SearchEngine
+from snapshot import SNAPSHOT_FILE, SnapshotError, load_snapshot
+
+RESOLVED_COLUMNS = ("фио", "должность", "подразделение", "источник")  # Колонки, добавляемые resolve
+
+
+def open_sheets(snapshot_path):
+    """Данные справочника из снимка, который пишет импорт"""
+    try:
+        return load_snapshot(snapshot_path)
+    except (OSError, SnapshotError) as e:
+        raise SystemExit(f"Нет данных справочника ({e}). Сначала выполните: python cli.py import <книга.xlsx>")
+
+
+def phone_directory(sheets):
+    from phone_lookup import PhoneDirectory
+
+    return PhoneDirectory.from_records(sheets.get("osfr", ()), sheets.get("ks", ()))
+
+
+def search_engine(sheet, store):
+    """Поиск по листу с теми же полями, что и у справочника номеров"""
+    from phone_lookup import SHEET_SOURCES, SOURCES
+
+    fields = SOURCES[SHEET_SOURCES[sheet]]
+    engine = SearchEngine(fields["fio"], (fields["city"], fields["internal"]), fields["dept"])
+    engine.set_data(store)
+    return engine
+
+
+def describe_owner(owner):
+    return (f"{owner['фио']} - {owner['должность']}, {owner['подразделение']} "
+            f"({owner['источник']}, {owner['номер']})")
+
+
+def cmd_import(args):
+    """Разбор книги обработчиками SprOsfr/SprKs и сохранение снимка"""
+    from class_tel_spr import load_sheets
+
+    start = time.perf_counter()
+    try:
+        sheets = load_sheets(args.path, export_json=args.json, snapshot_path=args.snapshot,
+                             streaming=args.streaming, workers=args.workers, database=args.database)
+    except FileNotFoundError as e:
+        raise SystemExit(f"Ошибка: {e}")
+    elapsed = time.perf_counter() - start
+    for name, store in sheets.items():
+        print(f"{name}: {len(store)} записей")
+    print(f"Импорт за {elapsed:.2f} с, снимок: {args.snapshot}")
+
+
+def cmd_query(args):
+    """Поиск по ФИО или владельца номера"""
+    sheets = open_sheets(args.snapshot)
+    text = " ".join(args.text)
+    if PHONE_QUERY.match(text):
+        owners = phone_directory(sheets).lookup(text)
+        for owner in owners:
+            print(describe_owner(owner))
+        if not owners:
+            print("Номер не найден")
+            return 1
+        return 0
+
+    found = 0
+    for name in args.sheet or sheets:
+        engine = search_engine(name, sheets[name])
+        engine.update(text, fuzzy=args.fuzzy)
+        for record in engine.result[:args.limit]:
+            print(name, *(value for value in (record[column] for column in record.keys())
+                          if value not in ("", None)), sep="\t")
+        found += len(engine.result)
+    if not found:
+        print("Ничего не найдено")
+        return 1
+    return 0
+
+
+def iter_rows(stream, delimiter):
+    """Строки входного файла по одной (файл не загружается в память целиком)"""
+    if delimiter is None:
+        for line in stream:
+            yield [line.rstrip("\r\n")]
+    else:
+        yield from csv.reader(stream, delimiter=delimiter)
+
+
+def cmd_resolve(args):
+    """Пакетное определение владельцев номеров: к каждой строке добавляются колонки RESOLVED_COLUMNS"""
+    directory = phone_directory(open_sheets(args.snapshot))
+
+    @lru_cache(maxsize=65536)
+    def resolve(number):
+        # В журналах звонков номера повторяются, повторный поиск берется из кэша
+        owners = directory.lookup(number)
+        if not owners:
+            return ("",) * len(RESOLVED_COLUMNS)
+        return tuple("; ".join(dict.fromkeys(str(owner[column]) for owner in owners))
+                     for column in RESOLVED_COLUMNS)
+
+    source = open(args.input, encoding="utf-8", newline="") if args.input != "-" else sys.stdin
+    target = open(args.output, "w", encoding="utf-8", newline="") if args.output != "-" else sys.stdout
+    writer = csv.writer(target, delimiter=args.delimiter or "\t", lineterminator="\n")
+    total = resolved = 0
+    start = time.perf_counter()
+    try:
+        for row in iter_rows(source, args.delimiter):
+            number = row[args.column] if args.column < len(row) else ""
+            if not number.strip():
+                continue  # Пустая строка или строка без номера ([""] в режиме без разделителя)
+            owner = resolve(number)
+            writer.writerow(row + list(owner))
+            total += 1
+            resolved += bool(owner[3])  # Источник заполнен, если владелец найден
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed else 0
+    print(f"Номеров: {total}, найдено владельцев: {resolved}, {elapsed:.2f} с ({rate:.0f} номеров/с)",
+          file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Телефонный справочник без окна")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="файл снимка справочника")
+    parser.add_argument("-v", "--verbose", action="store_true", help="выводить сообщения импорта")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("import", help="разобрать книгу Excel и сохранить снимок")
+    command.add_argument("path", help="книга Excel")
+    command.add_argument("--json", action="store_true", help="дополнительно записать JSON")
+    command.add_argument("--streaming", action="store_true", default=None, help="потоковое чтение книги")
+    command.add_argument("--workers", type=int, default=None,
+                         help="число процессов разбора (по умолчанию 1; больше 1 - по процессу на обработчик)")
+    command.add_argument("--database", help="дополнительно заполнить базу SQLite (например, JSON/directory.db)")
+    command.set_defaults(func=cmd_import)
+
+    command = commands.add_parser("query", help="поиск по ФИО или номеру телефона")
+    command.add_argument("text", nargs="+", help="ФИО (части через пробел) или номер в любом формате")
+    command.add_argument("--sheet", action="append", choices=("osfr", "ks"), help="искать только в листе")
+    command.add_argument("--fuzzy", action="store_true", help="с учетом опечаток и раскладки")
+    command.add_argument("--limit", type=int, default=20, help="число выводимых записей на лист")
+    command.set_defaults(func=cmd_query)
+
+    command = commands.add_parser("resolve", help="определить владельцев номеров из файла")
+    command.add_argument("input", help="файл с номерами по одному в строке или CSV (- - стандартный ввод)")
+    command.add_argument("-o", "--output", default="-", help="результат (по умолчанию - стандартный вывод)")
+    command.add_argument("--column", type=int, default=0, help="номер колонки с номером телефона в CSV")
+    command.add_argument("--delimiter", help="разделитель колонок CSV (без него каждая строка - номер)")
+    command.set_defaults(func=cmd_resolve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
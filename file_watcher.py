@@ -0,0 +1,116 @@
+import os
+import queue
+import threading
+import time
+
+
+def file_state(path):
+    """Время изменения и размер файла - признак того, что файл перезаписан"""
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+class FileWatcher(threading.Thread):
+    """
+    Слежение за изменением файла в фоновом потоке: раз в interval секунд сравниваются
+    время изменения и размер файла (os.stat), содержимое не читается.
+    Серия сохранений подряд дает одно уведомление - когда файл не меняется settle секунд.
+    Известное состояние файла меняет только watch (после успешного импорта), поэтому
+    изменение не теряется, если импорт не удался: failed сообщает о нем еще раз с растущей
+    задержкой, после max_retries неудач - только когда файл снова изменится.
+    Окно забирает уведомления из очереди (poll) по таймеру root.after, как у ImportWorker.
+    """
+
+    def __init__(self, interval=2.0, settle=1.0, max_retries=5):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.settle = settle
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.path = None
+        self.state = None
+        self.reported = None  # Состояние, о котором уже сообщено
+        self.failures = 0  # Неудачные импорты состояния reported подряд
+        self.retry_at = None  # Когда сообщить о reported еще раз (time.monotonic), None - не сообщать
+        self.changes = queue.Queue()
+        self.stop_event = threading.Event()
+
+    def watch(self, path, state=None):
+        """
+        Следить за файлом
+        :param state: состояние файла (file_state), изменения относительно которого сообщаются;
+            None - текущее состояние
+        """
+        if state is None:
+            try:
+                state = file_state(path)
+            except OSError:
+                state = None
+        with self.lock:
+            self.path = path
+            self.state = state
+            self.reported = None
+            self.failures = 0
+            self.retry_at = None
+
+    def rearm(self):
+        """Сообщить о последнем изменении еще раз при следующей проверке (например, после включения обновления)"""
+        with self.lock:
+            self.failures = 0
+            self.retry_at = time.monotonic()
+
+    def failed(self):
+        """
+        Импорт последнего изменения не удался: о нем будет сообщено еще раз через settle * 2**n секунд
+        :return: False, если неудач уже max_retries - повтор только после нового изменения файла
+        """
+        with self.lock:
+            self.failures += 1
+            if self.failures > self.max_retries:
+                self.retry_at = None
+                return False
+            self.retry_at = time.monotonic() + self.settle * 2 ** self.failures
+            return True
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        pending = None  # (путь, новое состояние, когда замечено)
+        while not self.stop_event.wait(self.interval if pending is None else min(self.interval, self.settle)):
+            with self.lock:
+                path, known, reported, retry_at = self.path, self.state, self.reported, self.retry_at
+            try:
+                state = file_state(path) if path else None
+            except OSError:
+                state = None  # Файл удален или пересохраняется через временный файл
+            now = time.monotonic()
+            if state == reported and retry_at is not None and now >= retry_at:
+                reported = None  # Пора повторить
+            if state is None or state == known or state == reported:
+                pending = None
+                continue
+            if pending is None or pending[:2] != (path, state):
+                pending = (path, state, now)  # Файл еще может меняться - ждем, пока он не перестанет
+                continue
+            if now - pending[2] < self.settle:
+                continue
+            with self.lock:
+                if self.path != path:
+                    pending = None
+                    continue
+                if state != self.reported:
+                    self.failures = 0
+                self.reported = state
+                self.retry_at = None
+            self.changes.put((path, state))
+            pending = None
+
+    def poll(self):
+        """Последнее изменение (путь, состояние) с прошлого вызова или None (вызывать из потока Tk)"""
+        change = None
+        while True:
+            try:
+                change = self.changes.get_nowait()
+            except queue.Empty:
+                return change
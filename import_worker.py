@@ -0,0 +1,103 @@
+import queue
+import threading
+
+from class_tel_spr import ImportCancelled, load_xls
+from profiling import cprofile, span
+from record_diff import diff_stores
+from sqlite_store import DirectoryDB
+
+
+class ImportWorker(threading.Thread):
+    """
+    Импорт книги в фоновом потоке.
+    Окно забирает сообщения о ходе импорта из очереди (poll) по таймеру root.after.
+    """
+
+    def __init__(self, path_xls, previous=None, workers=None, database=None, profile_path=None, auto=False):
+        """
+        :param path_xls: путь к книге
+        :param workers: число процессов импорта (см. load_xls)
+        :param database: файл базы SQLite, которую заполняет импорт
+        :param profile_path: файл для профиля cProfile импорта (None - по переменной TELSPR_CPROFILE)
+        :param auto: повторный импорт по изменению книги (см. Window.poll_watcher)
+        :param previous: текущие данные {"osfr": RecordStore, "ks": RecordStore} - для них
+            после импорта строятся отчеты об изменениях (self.reports)
+        """
+        super().__init__(daemon=True)
+        self.path_xls = path_xls
+        self.previous = previous
+        self.workers = workers
+        self.database = database
+        self.profile_path = profile_path
+        self.auto = auto
+        self.reports = None
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+
+    def run(self):
+        try:
+            with cprofile(self.profile_path):
+                self.result = load_xls(self.path_xls, progress=self.on_progress, cancel=self.cancel_event,
+                                       workers=self.workers, database=self.database)
+            ks_data, osfr_data = self.result
+            if self.previous and ks_data is not None and osfr_data is not None:
+                self.on_progress("Сравнение с текущими данными", 100)
+                self.reports = {
+                    "osfr": diff_stores(self.previous["osfr"], osfr_data, "osfr"),
+                    "ks": diff_stores(self.previous["ks"], ks_data, "ks"),
+                }
+        except ImportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        self.messages.put(("done", None, None))
+
+    def on_progress(self, text, percent):
+        """Вызывается из фонового потока - только кладет сообщение в очередь"""
+        self.messages.put(("progress", text, percent))
+
+    def cancel(self):
+        """Запрос отмены, импорт прервется на ближайшей проверке"""
+        self.cancel_event.set()
+
+    def poll(self):
+        """Забирает накопившиеся сообщения (вызывать из потока Tk)"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+
+class DatabaseWriter(threading.Thread):
+    """
+    Запись данных вкладок в базу SQLite в фоновом потоке (включение хранения в базе).
+    Поток пишет через свое соединение; окно проверяет окончание (is_alive) по таймеру root.after.
+    """
+
+    def __init__(self, path, sheets, key):
+        """
+        :param path: файл базы
+        :param sheets: {"osfr": RecordStore, "ks": RecordStore}
+        :param key: ключ книги (см. DirectoryDB.write_sheets)
+        """
+        super().__init__(daemon=True)
+        self.path = path
+        self.sheets = sheets
+        self.key = key
+        self.error = None
+
+    def run(self):
+        try:
+            database = DirectoryDB(self.path)
+            try:
+                with span("serialize", file=self.path):
+                    database.write_sheets(self.sheets, self.key)
+            finally:
+                database.close()
+        except Exception as e:
+            self.error = e
@@ -1,9 +1,14 @@
-import tkinter as tk
-from app import Window
-from class_tel_spr import load_xls
+import logging
+import time
+
+START_TIME = time.perf_counter()  # Отсчет времени запуска - до импорта модулей окна
+
+import tkinter as tk  # noqa: E402
+from app import Window  # noqa: E402
 
 if __name__ == '__main__':
+    # Сообщения импорта выводятся в консоль, как и раньше
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     root = tk.Tk()
-    app = Window(root)
-    root.mainloop()
-
+    app = Window(root, start_time=START_TIME)
+    root.mainloop()
\ No newline at end of file
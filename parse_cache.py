@@ -0,0 +1,89 @@
+import hashlib
+import os
+import pickle
+
+
+class ParseCache:
+    """
+    Кэш результатов разбора книг на диске.
+    Ключ - хэш содержимого файла и версия парсера, старые записи вытесняются по LRU.
+    """
+
+    suffix = ".pickle"
+
+    def __init__(self, cache_dir=os.path.join("JSON", "cache"), max_entries=8, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def file_hash(path, chunk_size=1024 * 1024):
+        """SHA-256 содержимого файла"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def make_key(self, path, version):
+        """Ключ записи: хэш содержимого + версия парсера"""
+        return f"{self.file_hash(path)}-v{version}"
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key):
+        """Возвращает сохраненный результат или None"""
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError):
+            # Поврежденная запись - удаляем и разбираем книгу заново
+            self.discard(key)
+            return None
+        os.utime(path)  # Время изменения файла служит отметкой последнего использования
+        return value
+
+    def put(self, key, value):
+        """Сохраняет результат и вытесняет старые записи"""
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        path = self.entry_path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def discard(self, key):
+        try:
+            os.remove(self.entry_path(key))
+        except OSError:
+            pass
+
+    def entries(self):
+        """Записи кэша от самой свежей к самой старой: [(путь, размер, время использования)]"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        result = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self.suffix):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                result.append((os.path.join(self.cache_dir, name), stat.st_size, stat.st_mtime))
+        result.sort(key=lambda entry: entry[2], reverse=True)
+        return result
+
+    def evict(self):
+        """Удаляет записи сверх лимитов по количеству и общему размеру"""
+        kept = 0
+        total = 0
+        for path, size, _ in self.entries():
+            # Самая свежая запись остается всегда, даже если она больше лимита
+            if kept < self.max_entries and (kept == 0 or total + size <= self.max_bytes):
+                kept += 1
+                total += size
+            else:
+                os.remove(path)
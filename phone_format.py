@@ -0,0 +1,95 @@
+"""
+Нормализация телефонных номеров по таблице правил: номер за один проход приводится
+к виду для отображения и к ключу из цифр для индексов (справочник номеров, база SQLite)
+"""
+import hashlib
+
+# Правила форматирования: (название, число цифр, начало номера, шаблон; X - очередная цифра).
+# Правила проверяются по порядку, применяется первое подходящее.
+# Номера из 10 цифр - федеральные (код + номер), к ним приводятся и номера с 8 или +7 в начале.
+PHONE_RULES = (
+    ("mobile", 10, "9", "+7 (XXX) XXX-XX-XX"),
+    ("city_code", 10, "3902", "+7 (XXXX) XX-XX-XX"),  # Абакан: код из 4 цифр, номер из 6
+    ("city_code", 10, "390", "+7 (XXXXX) X-XX-XX"),  # Остальные города Хакасии (Черногорск 39031, Саяногорск 39042)
+    ("federal", 10, "", "+7 (XXX) XXX-XX-XX"),
+    ("local", 6, "", "XX-XX-XX"),
+    ("local", 5, "", "X-XX-XX"),
+)
+COUNTRY_CODE = "7"
+TRUNK_PREFIXES = ("7", "8")  # Первая цифра номера из 11 цифр, которая отбрасывается перед правилами
+SEPARATORS = str.maketrans("", "", " \u00a0()-+.")  # Знаки, допустимые в записи одного номера
+
+
+class PhoneFormatter:
+    """
+    Форматирование номеров по правилам, скомпилированным один раз при создании.
+    Результаты запоминаются: общие номера отделов повторяются в книге много раз.
+    """
+
+    def __init__(self, rules=PHONE_RULES, country_code=COUNTRY_CODE, trunk_prefixes=TRUNK_PREFIXES,
+                 max_cache=100000):
+        self.country_code = country_code
+        self.trunk_prefixes = trunk_prefixes
+        self.national_length = 0  # Число цифр федерального номера (без кода страны)
+        # Число цифр -> [(начало номера, строка формата)]
+        self.rules = {}
+        for _, length, prefix, template in rules:
+            self.rules.setdefault(length, []).append((prefix, template.replace("X", "{}")))
+            if template.startswith("+"):
+                self.national_length = max(self.national_length, length)
+        # Отпечаток настроек: входит в ключ кэша разбора, смена правил сбрасывает кэш и снимок
+        self.digest = hashlib.sha256(repr((rules, country_code, trunk_prefixes)).encode("utf-8")).hexdigest()[:8]
+        self.max_cache = max_cache
+        self.cache = {}
+
+    def normalize(self, value):
+        """
+        Номер для отображения и ключ
+        :param value: значение ячейки (строка или число)
+        :return: (отображение, ключ из цифр); номера, к которым нет правила, и текст
+            возвращаются как str(value).strip(), ключ - все цифры значения
+        """
+        # Тип входит в ключ: 123456 и 123456.0 (как и True и 1) равны как ключи словаря, а форматируются по-разному
+        key = (value.__class__, value)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.parse(value)
+            if len(self.cache) >= self.max_cache:
+                self.cache.clear()
+            self.cache[key] = result
+        return result
+
+    def parse(self, value):
+        text = str(value).strip()
+        digits = text.translate(SEPARATORS)
+        if not digits.isdigit():
+            # Текст или несколько номеров в ячейке - как есть
+            return text, "".join(ch for ch in text if ch.isdigit())
+        if len(digits) == self.national_length + 1 and digits[0] in self.trunk_prefixes:
+            digits = digits[1:]
+        for prefix, template in self.rules.get(len(digits), ()):
+            if digits.startswith(prefix):
+                break
+        else:
+            return text, digits
+        key = self.country_code + digits if len(digits) == self.national_length else digits
+        return template.format(*digits), key
+
+    def display(self, value):
+        return self.normalize(value)[0]
+
+    def key(self, value):
+        return self.normalize(value)[1]
+
+
+PHONES = PhoneFormatter()
+
+
+def format_phone(value):
+    """Номер для отображения: 123456 -> "12-34-56", "89131234567" -> "+7 (913) 123-45-67" """
+    return PHONES.normalize(value)[0]
+
+
+def phone_key(value):
+    """Ключ номера для индексов: "8 (3902) 12-34-56" и "+7 3902 123456" -> "73902123456" """
+    return PHONES.normalize(value)[1]
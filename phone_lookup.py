@@ -0,0 +1,108 @@
+import re
+
+from phone_format import phone_key
+
+# Откуда брать номера и владельцев в записях каждого листа
+SOURCES = {
+    "ОСФР": {
+        "city": "Городской номер",
+        "internal": "Кор. тел.",
+        "fio": ("ФАМИЛИЯ", "ИМЯ", "ОТЧЕСТВО"),
+        "position": "ДОЛЖНОСТЬ",
+        "dept": "Отдел",
+    },
+    "Клиентские службы": {
+        "city": "город",
+        "internal": "кспд",
+        "fio": ("Фамилия", "Имя", "Отчество"),
+        "position": "Должность",
+        "dept": "отдел",
+    },
+}
+
+SHEET_SOURCES = {"osfr": "ОСФР", "ks": "Клиентские службы"}  # Данные листа в снимке -> название источника
+
+NUMBER_SEPARATORS = re.compile(r"[,;/\n]")  # В одной ячейке может быть несколько номеров
+ENTRIES = ""  # Ключ узла дерева со списком номеров, заканчивающихся в этом узле
+
+
+class PhoneDirectory:
+    """
+    Обратный поиск владельца по номеру телефона.
+    Номера хранятся в префиксном дереве по цифрам, записанным с конца, поэтому входящий номер
+    в любом формате ("+7 (8xx) 12-34-56", "123456") находится за O(длины номера):
+    совпадение по концу номера допускается для городских номеров, внутренний - только целиком.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, number, source, record, kind="city"):
+        """
+        Добавляет номер(а) из ячейки
+        :param number: значение ячейки, может содержать несколько номеров через запятую
+        :param source: название листа ("ОСФР", "Клиентские службы")
+        :param record: запись владельца
+        :param kind: "city" - городской, "internal" - внутренний
+        """
+        for part in NUMBER_SEPARATORS.split(str(number)):
+            digits = phone_key(part)
+            if not digits:
+                continue
+            node = self.root
+            for digit in reversed(digits):
+                node = node.setdefault(digit, {})
+            node.setdefault(ENTRIES, []).append((kind, part.strip(), source, record))
+            self.count += 1
+
+    def add_records(self, source, records):
+        """Добавляет все номера из записей листа"""
+        fields = SOURCES[source]
+        for record in records:
+            self.add(record.get(fields["city"], ""), source, record, "city")
+            self.add(record.get(fields["internal"], ""), source, record, "internal")
+
+    @classmethod
+    def from_records(cls, osfr_data=(), ks_data=()):
+        """Справочник номеров по данным листов ОСФР и Клиентские службы"""
+        directory = cls()
+        directory.add_records("ОСФР", osfr_data)
+        directory.add_records("Клиентские службы", ks_data)
+        return directory
+
+    def lookup(self, number):
+        """
+        Владельцы номера
+        :param number: номер в любом формате
+        :return: список словарей с ключами "номер", "тип", "источник", "фио", "должность", "подразделение", "запись"
+        """
+        digits = phone_key(number)
+        node = self.root
+        best = []
+        for depth, digit in enumerate(reversed(digits), start=1):
+            node = node.get(digit)
+            if node is None:
+                break
+            entries = [entry for entry in node.get(ENTRIES, ())
+                       if entry[0] == "city" or depth == len(digits)]
+            if entries:
+                best = entries  # Самое длинное совпадение по концу номера
+        return [self.describe(*entry) for entry in best]
+
+    @staticmethod
+    def describe(kind, number, source, record):
+        fields = SOURCES[source]
+        fio = " ".join(record.get(field, "") for field in fields["fio"] if record.get(field, ""))
+        return {
+            "номер": number,
+            "тип": kind,
+            "источник": source,
+            "фио": fio,
+            "должность": record.get(fields["position"], ""),
+            "подразделение": record.get(fields["dept"], "") or "",
+            "запись": record,
+        }
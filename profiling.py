@@ -0,0 +1,143 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PROFILE_ENV = "TELSPR_PROFILE"  # 1 - собирать замеры этапов с запуска программы
+CPROFILE_ENV = "TELSPR_CPROFILE"  # Файл, в который пишется профиль cProfile каждого импорта
+CPROFILE_FILE = os.path.join("JSON", "import.prof")
+
+
+class Span:
+    """Замер одного этапа"""
+
+    __slots__ = ("name", "start", "duration", "thread", "args")
+
+    def __init__(self, name, start, duration, thread, args):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.thread = thread
+        self.args = args
+
+    def to_dict(self):
+        return {"этап": self.name, "начало": self.start, "длительность": self.duration,
+                "поток": self.thread, **({"параметры": self.args} if self.args else {})}
+
+
+class Tracer:
+    """
+    Замеры этапов импорта и работы окна (открытие книги, чтение листов, обработка, запись,
+    загрузка, отрисовка, фильтр). Выключенный замер не создает объектов и почти ничего не стоит.
+    """
+
+    def __init__(self, enabled=False, max_spans=100000):
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.spans = []
+        self.origin = time.perf_counter()
+        self.listener = None  # Функция listener(text), получает сводку после каждой операции
+
+    def span(self, name, **args):
+        """Контекстный менеджер замера этапа: with tracer.span("parse", sheet="ОСФР"): ..."""
+        if not self.enabled:
+            return nullcontext()
+        return self.measure(name, args)
+
+    @contextmanager
+    def measure(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start, args)
+
+    def add(self, name, start, duration, args=None):
+        if len(self.spans) >= self.max_spans:
+            del self.spans[:len(self.spans) // 2]  # Старые замеры отбрасываются
+        self.spans.append(Span(name, start - self.origin, duration, threading.get_ident(), args or {}))
+
+    def mark(self):
+        """Метка для сводки по замерам, сделанным после нее"""
+        return len(self.spans)
+
+    @contextmanager
+    def operation(self, title):
+        """Операция пользователя: ее этапы после завершения уходят сводкой в listener"""
+        if not self.enabled:
+            yield
+            return
+        mark = self.mark()
+        with self.measure(title, {}):
+            yield
+        self.report(title, mark)
+
+    def summary(self, title, since=0):
+        """Строка сводки: общее время операции и самые долгие этапы"""
+        spans = self.spans[since:]
+        if not spans:
+            return ""
+        total = max(span.start + span.duration for span in spans) - min(span.start for span in spans)
+        stages = {}
+        for span in spans:
+            if span.name != title:
+                stages[span.name] = stages.get(span.name, 0) + span.duration
+        top = sorted(stages.items(), key=lambda item: item[1], reverse=True)[:4]
+        return f"{title}: {total * 1000:.0f} мс" + "".join(f", {name} {duration * 1000:.0f} мс"
+                                                            for name, duration in top)
+
+    def report(self, title, since=0):
+        text = self.summary(title, since)
+        if text:
+            if self.listener is not None:
+                self.listener(text)
+            else:
+                print(text)
+
+    def clear(self):
+        self.spans = []
+
+    def export_json(self, path):
+        """Замеры списком в JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([span.to_dict() for span in self.spans], f, ensure_ascii=False, indent=2)
+
+    def export_chrome_trace(self, path):
+        """Замеры в формате Chrome Trace (открывается в chrome://tracing или Perfetto)"""
+        pid = os.getpid()
+        events = [{"name": span.name, "ph": "X", "ts": span.start * 1e6, "dur": span.duration * 1e6,
+                   "pid": pid, "tid": span.thread, "args": span.args} for span in self.spans]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+tracer = Tracer(enabled=os.environ.get(PROFILE_ENV, "") not in ("", "0"))
+
+
+def span(name, **args):
+    """Замер этапа глобальным tracer"""
+    return tracer.span(name, **args)
+
+
+@contextmanager
+def cprofile(path=None):
+    """
+    Профиль cProfile блока кода в файл (смотреть: python -m pstats файл или snakeviz)
+    :param path: файл профиля (None - из переменной TELSPR_CPROFILE; если ее нет - без профиля)
+    """
+    path = path or os.environ.get(CPROFILE_ENV)
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        profiler.dump_stats(path)
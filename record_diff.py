@@ -0,0 +1,89 @@
+import json
+import os
+
+# Поля ключа строки: для сотрудника - ФИО и подразделение, для строки без ФИО (приемная,
+# общий номер отдела) - номера телефонов и подразделение
+KEY_FIELDS = {
+    "osfr": (("ФАМИЛИЯ", "ИМЯ", "ОТЧЕСТВО", "Отдел"), ("Городской номер", "Кор. тел.", "Отдел")),
+    "ks": (("Фамилия", "Имя", "Отчество", "отдел"), ("город", "кспд", "отдел")),
+}
+
+
+def row_keys(store, sheet):
+    """
+    Стабильные ключи строк хранилища в виде строк (подходят как iid для ttk.Treeview).
+    Совпадающие ключи различаются порядковым номером повтора.
+    """
+    name_fields, phone_fields = KEY_FIELDS[sheet]
+    name_columns = [store.column(field) for field in name_fields]
+    phone_columns = [store.column(field) for field in phone_fields]
+    seen = {}
+    keys = []
+    for names, phones in zip(zip(*name_columns), zip(*phone_columns)):
+        # Последнее поле в обоих наборах - подразделение, ФИО есть, если заполнено хоть одно из первых полей
+        parts = names if any(names[:-1]) else ("#тел",) + phones
+        key = "|".join(str(part) for part in parts)
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        keys.append(key if count == 0 else f"{key}|{count}")
+    return keys
+
+
+class ChangeReport:
+    """Отчет об изменениях листа между двумя импортами"""
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.inserts = []  # (ключ, номер строки в новых данных)
+        self.updates = []  # (ключ, номер строки в старых, номер строки в новых, измененные поля)
+        self.deletes = []  # (ключ, номер строки в старых данных)
+        self.new_keys = []  # Ключи всех строк новых данных по порядку
+
+    def __bool__(self):
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def summary(self):
+        return (f"добавлено: {len(self.inserts)}, изменено: {len(self.updates)}, "
+                f"удалено: {len(self.deletes)}")
+
+    def to_dict(self):
+        return {
+            "лист": self.sheet,
+            "добавлено": [key for key, _ in self.inserts],
+            "изменено": [{"ключ": key, "поля": fields} for key, _, _, fields in self.updates],
+            "удалено": [key for key, _ in self.deletes],
+        }
+
+
+def diff_stores(old, new, sheet):
+    """
+    Построчное сравнение двух RecordStore листа
+    :param sheet: "osfr" или "ks" (см. KEY_FIELDS)
+    :return: ChangeReport
+    """
+    report = ChangeReport(sheet)
+    columns = list(new.columns) + [column for column in old.columns if column not in new.positions]
+    old_rows = list(zip(*[old.column(column) for column in columns])) if len(old) else []
+    new_rows = list(zip(*[new.column(column) for column in columns])) if len(new) else []
+
+    old_index = {key: row for row, key in enumerate(row_keys(old, sheet))} if len(old) else {}
+    report.new_keys = row_keys(new, sheet) if len(new) else []
+
+    for row, key in enumerate(report.new_keys):
+        old_row = old_index.pop(key, None)
+        if old_row is None:
+            report.inserts.append((key, row))
+        elif old_rows[old_row] != new_rows[row]:
+            fields = [column for column, before, after in zip(columns, old_rows[old_row], new_rows[row])
+                      if before != after]
+            report.updates.append((key, old_row, row, fields))
+    report.deletes = sorted(old_index.items(), key=lambda item: item[1])
+    return report
+
+
+def save_reports(reports, output_dir="JSON", output_file="changes.json"):
+    """Сохраняет отчеты об изменениях в JSON"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    with open(os.path.join(output_dir, output_file), 'w', encoding='utf-8') as f:
+        json.dump([report.to_dict() for report in reports], f, ensure_ascii=False, indent=2)
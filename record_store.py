@@ -0,0 +1,146 @@
+import sys
+
+
+class Record:
+    """Запись хранилища: легкое представление строки без копирования значений"""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def get(self, key, default=""):
+        position = self.store.positions.get(key)
+        if position is None:
+            return default
+        return self.store.values[position][self.row]
+
+    def __getitem__(self, key):
+        return self.store.values[self.store.positions[key]][self.row]
+
+    def keys(self):
+        return self.store.columns
+
+    def to_dict(self):
+        return {column: values[self.row] for column, values in zip(self.store.columns, self.store.values)}
+
+    def __repr__(self):
+        return f"Record({self.to_dict()!r})"
+
+
+class RecordView:
+    """Подмножество записей хранилища по номерам строк (результат фильтра)"""
+
+    __slots__ = ("store", "rows")
+
+    def __init__(self, store, rows):
+        self.store = store
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Record(self.store, row) for row in self.rows[index]]
+        return Record(self.store, self.rows[index])
+
+    def __iter__(self):
+        store = self.store
+        return (Record(store, row) for row in self.rows)
+
+
+class RecordStore:
+    """
+    Компактное хранилище записей листа по колонкам.
+    Вместо словаря на каждую строку - по одному списку на колонку, повторяющиеся значения
+    (отдел, должность, место расположения) хранятся одной интернированной строкой.
+    """
+
+    __slots__ = ("columns", "positions", "values")
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.positions = {column: position for position, column in enumerate(self.columns)}
+        self.values = [[] for _ in self.columns]
+
+    @classmethod
+    def from_dicts(cls, records, columns=None):
+        """
+        Хранилище из списка словарей (результат obrabotka_* или json.load)
+        :param columns: порядок колонок, по умолчанию - ключи записей в порядке появления
+        """
+        if isinstance(records, RecordStore):
+            return records
+        if columns is None:
+            columns = {}
+            for record in records:
+                for key in record:
+                    columns.setdefault(key, None)
+        store = cls(columns)
+        for record in records:
+            store.append(record)
+        return store
+
+    @classmethod
+    def from_stream(cls, records):
+        """Хранилище из потока словарей, колонки - по ключам первой записи"""
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            return cls(())
+        store = cls(first.keys())
+        store.append(first)
+        for record in records:
+            store.append(record)
+        return store
+
+    def append(self, record):
+        """Добавляет запись (словарь), недостающие колонки заполняются пустой строкой"""
+        for column, values in zip(self.columns, self.values):
+            value = record.get(column, "")
+            values.append(sys.intern(value) if type(value) is str else value)
+
+    def __len__(self):
+        return len(self.values[0]) if self.values else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Record(self, row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RecordStore index out of range")
+        return Record(self, index)
+
+    def __iter__(self):
+        return (Record(self, row) for row in range(len(self)))
+
+    def column(self, key):
+        """Значения колонки (список, не копируется); для отсутствующей колонки - пустые строки"""
+        position = self.positions.get(key)
+        if position is None:
+            return [""] * len(self)
+        return self.values[position]
+
+    def view(self, rows):
+        """Записи с указанными номерами строк"""
+        return RecordView(self, rows)
+
+    def to_dicts(self):
+        """Обратно в список словарей (для экспорта в JSON)"""
+        return [dict(zip(self.columns, row)) for row in zip(*self.values)]
+
+    def to_columns(self):
+        """Колонки и их значения (для сохранения снимка)"""
+        return self.columns, self.values
+
+    @classmethod
+    def from_columns(cls, columns, values):
+        """Хранилище из сохраненных колонок, списки значений не копируются"""
+        if len(columns) != len(values):
+            raise ValueError("Число колонок не совпадает с числом списков значений")
+        store = cls(columns)
+        store.values = list(values)
+        return store
@@ -0,0 +1,282 @@
+import re
+
+from record_store import RecordStore
+
+PHONE_QUERY = re.compile(r"^[\d\s()+\-.]*\d[\d\s()+\-.]*$")  # Запрос похож на номер телефона
+FIELD_SEPARATOR = "\n"  # Разделитель полей в строке индекса, чтобы подстрока не захватывала соседнее поле
+
+
+def normalize_text(text):
+    """Приведение текста к виду для поиска: без учета регистра, ё = е"""
+    return str(text).casefold().replace("ё", "е")
+
+
+def phone_digits(text):
+    """Только цифры номера: "12-34-56" -> "123456" """
+    return "".join(ch for ch in str(text) if ch.isdigit())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Ошибка раскладки: текст набран на латинской раскладке вместо русской ("Bdfyjd" -> "Иванов")
+LAYOUT_SWAP = str.maketrans(
+    "`qwertyuiop[]asdfghjkl;'zxcvbnm,.~QWERTYUIOP{}ASDFGHJKL:\"ZXCVBNM<>",
+    "ёйцукенгшщзхъфывапролджэячсмитьбюЁЙЦУКЕНГШЩЗХЪФЫВАПРОЛДЖЭЯЧСМИТЬБЮ")
+
+
+def swap_layout(text):
+    """Текст, набранный на латинской раскладке, в русской раскладке"""
+    return text.translate(LAYOUT_SWAP)
+
+
+def edit_distance(first, second, limit):
+    """
+    Расстояние Левенштейна, вычисление прерывается, как только оно точно больше limit
+    :return: расстояние или limit + 1
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, start=1):
+        current = [i]
+        for j, other in enumerate(second, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def max_typos(token):
+    """Допустимое число опечаток в слове запроса в зависимости от его длины"""
+    if len(token) < 3:
+        return 0
+    return 1 if len(token) < 6 else 2
+
+
+class SearchIndex:
+    """
+    Индекс записей, строится один раз при загрузке данных.
+    Для каждой записи хранятся нормализованные ФИО и номера телефонов только из цифр,
+    для поиска подстроки - триграммы со списками записей, в которых они встречаются.
+    """
+
+    def __init__(self, store, name_fields, phone_fields):
+        self.names = []
+        self.phones = []
+        self.name_grams = {}
+        self.phone_grams = {}
+        name_columns = [store.column(field) for field in name_fields]
+        phone_columns = [store.column(field) for field in phone_fields]
+        for number, (name_values, phone_values) in enumerate(zip(zip(*name_columns), zip(*phone_columns))):
+            names = FIELD_SEPARATOR.join(normalize_text(value) for value in name_values)
+            phones = FIELD_SEPARATOR.join(phone_digits(value) for value in phone_values)
+            self.names.append(names)
+            self.phones.append(phones)
+            for gram in trigrams(names):
+                self.name_grams.setdefault(gram, set()).add(number)
+            for gram in trigrams(phones):
+                self.phone_grams.setdefault(gram, set()).add(number)
+
+        self.words = None  # Словарь слов ФИО для нечеткого поиска, строится при первом запросе
+
+    def __len__(self):
+        return len(self.names)
+
+    def build_words(self):
+        """Отдельные слова ФИО -> номера записей и триграммы слов (с краями) -> слова"""
+        self.words = {}
+        for number, names in enumerate(self.names):
+            for word in names.split():
+                self.words.setdefault(word, []).append(number)
+        self.word_grams = {}
+        for word in self.words:
+            for gram in trigrams(f" {word} "):
+                self.word_grams.setdefault(gram, []).append(word)
+
+    def similar_words(self, token):
+        """
+        Слова словаря, похожие на токен, со штрафом за отличие:
+        0 - слово совпадает, 0.5 - начинается с токена, 1 + число опечаток - отличается не больше
+        чем на max_typos(token) правок целиком или в начале слова (в начале - еще +0.5).
+        Кандидаты отбираются по общим триграммам: одна правка меняет не больше трех триграмм.
+        :return: словарь {слово: штраф}
+        """
+        limit = max_typos(token)
+        grams = trigrams(f" {token} ")
+        shared = {}
+        for gram in grams:
+            for word in self.word_grams.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        # Для сравнения с началом слова конечная триграмма токена может не совпасть
+        need = max(1, len(grams) - 3 * limit - 1)
+        result = {}
+        for word, count in shared.items():
+            if count < need:
+                continue
+            if word == token:
+                result[word] = 0
+            elif word.startswith(token):
+                result[word] = 0.5
+            elif limit:
+                whole = edit_distance(token, word, limit)
+                start = edit_distance(token, word[:len(token)], limit)
+                if min(whole, start) <= limit:
+                    result[word] = 1 + min(whole, start + 0.5)
+        return result
+
+    def fuzzy_matches(self, token, allowed):
+        """Записи, подходящие под токен: {номер записи: наименьший штраф} (1 - вхождение подстроки внутри слова)"""
+        found = {}
+        candidates = self.candidates(self.name_grams, token)
+        for number in candidates if candidates is not None else range(len(self)):
+            if (allowed is None or number in allowed) and token in self.names[number]:
+                found[number] = 1
+        for word, penalty in self.similar_words(token).items():
+            for number in self.words[word]:
+                if (allowed is None or number in allowed) and penalty < found.get(number, penalty + 1):
+                    found[number] = penalty
+        return found
+
+    def fuzzy_search(self, query, ids=None):
+        """
+        Нечеткий поиск по ФИО: ошибка раскладки, ё/е и опечатки в каждом слове запроса
+        :param ids: ограничить поиск этими записями
+        :return: номера записей, лучшие совпадения (меньше опечаток) первыми
+        """
+        if PHONE_QUERY.match(query):
+            return self.search(query, ids)
+        tokens = normalize_text(query).split()
+        if not tokens:
+            return sorted(ids) if ids is not None else list(range(len(self)))
+        if self.words is None:
+            self.build_words()
+
+        allowed = set(ids) if ids is not None else None
+        scores = None
+        for token in tokens:
+            matches = self.fuzzy_matches(token, allowed)
+            swapped = normalize_text(swap_layout(token))
+            if swapped != token:
+                for number, penalty in self.fuzzy_matches(swapped, allowed).items():
+                    if penalty < matches.get(number, penalty + 1):
+                        matches[number] = penalty
+            # Запись должна подходить под все слова запроса, штрафы складываются
+            if scores is None:
+                scores = matches
+            else:
+                scores = {number: score + matches[number] for number, score in scores.items() if number in matches}
+            if not scores:
+                return []
+        return sorted(scores, key=lambda number: (scores[number], number))
+
+    @staticmethod
+    def candidates(grams_index, token):
+        """Записи, содержащие все триграммы токена (None - токен короче триграммы)"""
+        grams = trigrams(token)
+        if not grams:
+            return None
+        postings = sorted((grams_index.get(gram, set()) for gram in grams), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def search(self, query, ids=None):
+        """
+        Номера записей, подходящих под запрос
+        :param query: ФИО (части через пробел ищутся одновременно) или номер в любом формате
+        :param ids: ограничить поиск этими записями (например, результатом предыдущего запроса)
+        :return: отсортированный список номеров записей
+        """
+        if PHONE_QUERY.match(query):
+            tokens = [phone_digits(query)]
+            haystacks, grams_index = self.phones, self.phone_grams
+        else:
+            tokens = normalize_text(query).split()
+            haystacks, grams_index = self.names, self.name_grams
+        if not tokens:
+            return sorted(ids) if ids is not None else list(range(len(self)))
+
+        found = set(ids) if ids is not None else None
+        for token in tokens:
+            candidates = self.candidates(grams_index, token)
+            if candidates is not None:
+                found = candidates if found is None else found & candidates
+        if found is None:
+            found = range(len(self))
+        # Триграммы только отсекают лишнее, совпадение подстроки проверяется по строке индекса
+        return sorted(number for number in found
+                      if all(token in haystacks[number] for token in tokens))
+
+
+class SearchEngine:
+    """
+    Фильтрация записей вкладки по подразделению и строке поиска.
+    Если новый запрос уточняет предыдущий (содержит его), поиск идет по предыдущему результату,
+    а повторный запрос с теми же параметрами ничего не пересчитывает.
+    """
+
+    def __init__(self, name_fields, phone_fields, dept_field):
+        self.name_fields = name_fields  # Поля ФИО
+        self.phone_fields = phone_fields  # Поля с номерами телефонов
+        self.dept_field = dept_field  # Поле подразделения
+        self.set_data([])
+
+    def set_data(self, data):
+        """Новые данные - индекс строится заново, предыдущие результаты больше не действительны"""
+        self.data = RecordStore.from_dicts(data)
+        self.index = SearchIndex(self.data, self.name_fields, self.phone_fields)
+        # Номера записей каждого подразделения: фильтр по подразделению - поиск в словаре
+        self.buckets = {}
+        if self.dept_field is not None:
+            for number, value in enumerate(self.data.column(self.dept_field)):
+                self.buckets.setdefault(value, []).append(number)
+        self.query = None
+        self.dept = None
+        self.fuzzy = False
+        self.ids = None
+        self.result = self.data
+
+    def departments(self):
+        """Подразделения в порядке первого появления в данных и число записей в каждом: [(подразделение, число)]"""
+        return [(dept, len(rows)) for dept, rows in self.buckets.items() if dept not in ("", None)]
+
+    def update(self, query, dept=None, fuzzy=False):
+        """
+        Пересчитывает результат для запроса и подразделения
+        :param query: строка поиска
+        :param dept: выбранное подразделение (None - все)
+        :param fuzzy: нечеткий поиск с учетом опечаток и раскладки, результат упорядочен по близости
+        :return: False, если параметры не изменились и результат прежний
+        """
+        query = query.strip()
+        if self.query is not None and query == self.query and dept == self.dept and fuzzy == self.fuzzy:
+            return False
+
+        same_kind = bool(PHONE_QUERY.match(self.query or "")) == bool(PHONE_QUERY.match(query))
+        # При нечетком поиске уточненный запрос может найти записи, которых не было в прежнем результате
+        if (self.query and dept == self.dept and same_kind and not fuzzy and not self.fuzzy
+                and normalize_text(self.query) in normalize_text(query)):
+            # Запрос уточнен - подходящие записи есть только среди прежних результатов
+            base = self.ids
+        elif dept:
+            base = self.buckets.get(dept, [])
+        else:
+            base = None
+
+        if query and fuzzy:
+            self.ids = self.index.fuzzy_search(query, base)
+        elif query:
+            self.ids = self.index.search(query, base)
+        else:
+            self.ids = base if base is not None else list(range(len(self.data)))
+        self.result = self.data.view(self.ids)
+        self.query = query
+        self.dept = dept
+        self.fuzzy = fuzzy
+        return True
@@ -0,0 +1,230 @@
+"""
+Служба поиска по справочнику для нескольких рабочих мест: книга разбирается один раз,
+запросы обслуживаются из индекса в памяти.
+
+    python server.py справочник.xlsx --port 8080
+
+    GET /search?q=Иванов[&sheet=osfr][&fuzzy=1][&limit=50]   поиск по ФИО или части номера
+    GET /phone/<номер>                                       владельцы номера
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from cli import phone_directory, search_engine
+from file_watcher import file_state
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+class ResponseCache:
+    """Готовые ответы на последние запросы, старые вытесняются по LRU"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class Directory:
+    """Индекс справочника: поиск по каждому листу и справочник номеров"""
+
+    def __init__(self, sheets, source_state=None):
+        self.sheets = sheets
+        self.engines = {name: search_engine(name, store) for name, store in sheets.items()}
+        self.phones = phone_directory(sheets)
+        self.source_state = source_state  # (mtime, размер) книги, из которой построен индекс
+
+    def search(self, query, sheet=None, fuzzy=False, limit=50):
+        result = {}
+        for name in [sheet] if sheet else self.engines:
+            engine = self.engines[name]
+            engine.update(query, fuzzy=fuzzy)
+            result[name] = {"всего": len(engine.result),
+                            "записи": [record.to_dict() for record in engine.result[:limit]]}
+        return result
+
+    def phone(self, number):
+        owners = self.phones.lookup(number)
+        return [dict(owner, запись=owner["запись"].to_dict()) for owner in owners]
+
+
+def build_directory(path_xls):
+    """Разбор книги обработчиками SprOsfr/SprKs (через кэш разбора) и построение индекса"""
+    from class_tel_spr import load_sheets
+
+    state = file_state(path_xls)
+    return Directory(load_sheets(path_xls), state)
+
+
+class LookupService:
+    """HTTP-служба на asyncio: один индекс в памяти, кэш ответов, перезагрузка при изменении книги"""
+
+    def __init__(self, path_xls, directory=None, cache_entries=1024, reload_interval=5.0):
+        self.path_xls = path_xls
+        self.directory = directory
+        self.cache = ResponseCache(cache_entries)
+        self.reload_interval = reload_interval
+        self.server = None
+        self.watch_task = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        loop = asyncio.get_running_loop()
+        if self.directory is None:
+            self.directory = await loop.run_in_executor(None, build_directory, self.path_xls)
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        if self.reload_interval:
+            self.watch_task = loop.create_task(self.watch())
+        return self.server
+
+    async def stop(self):
+        """Остановка слежения за книгой и сервера"""
+        if self.watch_task is not None:
+            self.watch_task.cancel()
+            try:
+                await self.watch_task
+            except asyncio.CancelledError:
+                pass
+            self.watch_task = None
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def watch(self):
+        """Перезагрузка индекса при изменении книги; пока идет разбор, запросы обслуживает прежний индекс"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if file_state(self.path_xls) == self.directory.source_state:
+                    continue
+                directory = await loop.run_in_executor(None, build_directory, self.path_xls)
+            except Exception as e:
+                logger.error("Не удалось перезагрузить справочник: %s", e)
+                continue
+            self.directory = directory
+            self.cache.clear()
+            logger.info("Справочник перезагружен: %s", self.path_xls)
+
+    def respond(self, target):
+        """Ответ на запрос: (код, тело в JSON)"""
+        url = urlsplit(target)
+        if url.path == "/search":
+            params = parse_qs(url.query)
+            query = params.get("q", [""])[0]
+            sheet = params.get("sheet", [None])[0]
+            if sheet is not None and sheet not in self.directory.engines:
+                return 400, {"ошибка": f"Нет листа {sheet}"}
+            # Цифры ищутся как часть номера, как в окне; владелец номера - GET /phone/<номер>
+            try:
+                limit = int(params.get("limit", ["50"])[0])
+            except ValueError:
+                return 400, {"ошибка": "limit должен быть числом"}
+            if limit < 0:
+                return 400, {"ошибка": "limit не может быть отрицательным"}
+            fuzzy = params.get("fuzzy", ["0"])[0] not in ("", "0", "false")
+            return 200, self.directory.search(query, sheet, fuzzy, limit)
+        if url.path.startswith("/phone/"):
+            return 200, self.directory.phone(unquote(url.path[len("/phone/"):]))
+        return 404, {"ошибка": "Неизвестный адрес"}
+
+    def cached_response(self, target):
+        body = self.cache.get(target)
+        if body is None:
+            try:
+                status, data = self.respond(target)
+            except Exception as e:
+                logger.exception("Ошибка обработки запроса %s", target)
+                status, data = 500, {"ошибка": str(e)}
+            body = (status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            if status == 200:
+                self.cache.put(target, body)
+        return body
+
+    async def handle_connection(self, reader, writer):
+        """Запросы одного соединения (HTTP/1.1 keep-alive), поддерживается только GET"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    status, body = 400, b'{}'
+                elif parts[0] != "GET":
+                    status, body = 405, b'{}'
+                else:
+                    status, body = self.cached_response(parts[1])
+                keep_alive = headers.get("connection", "").lower() != "close" and parts[-1:] == ["HTTP/1.1"]
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(path_xls, host, port, reload_interval):
+    service = LookupService(path_xls, reload_interval=reload_interval)
+    start = time.perf_counter()
+    server = await service.start(host, port)
+    logger.info("Справочник загружен за %.2f с, адрес http://%s:%s", time.perf_counter() - start, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Служба поиска по телефонному справочнику")
+    parser.add_argument("path", help="книга Excel")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="период проверки изменения книги, с (0 - не проверять)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        asyncio.run(serve(args.path, args.host, args.port, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
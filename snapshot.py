@@ -0,0 +1,80 @@
+import os
+import pickle
+import struct
+
+from record_store import RecordStore
+
+SNAPSHOT_MAGIC = b"TELSPR"
+SNAPSHOT_VERSION = 1  # Увеличивать при изменении содержимого снимка
+SNAPSHOT_FILE = os.path.join("JSON", "directory.snap")
+
+# Заголовок: сигнатура, версия формата, длина ключа исходной книги; затем ключ и данные (pickle)
+HEADER = struct.Struct("<6sHH")
+
+
+class SnapshotError(Exception):
+    """Файл не является снимком справочника или записан другой версией"""
+
+
+def save_snapshot(sheets, path=SNAPSHOT_FILE, key=""):
+    """
+    Сохраняет данные листов в компактный бинарный снимок
+    :param sheets: словарь {имя: RecordStore или список словарей}
+    :param path: файл снимка
+    :param key: ключ книги, из которой получены данные (см. ParseCache.make_key)
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    payload = {name: RecordStore.from_dicts(data).to_columns() for name, data in sheets.items()}
+    key_bytes = key.encode('utf-8')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(key_bytes)))
+        f.write(key_bytes)
+        # Одинаковые (интернированные) строки pickle записывает один раз
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_header(f):
+    header = f.read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise SnapshotError("Файл снимка поврежден")
+    magic, version, key_length = HEADER.unpack(header)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Файл не является снимком справочника")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Неподдерживаемая версия снимка: {version}")
+    key = f.read(key_length)
+    try:
+        if len(key) != key_length:
+            raise ValueError("ключ обрезан")
+        return key.decode('utf-8')
+    except ValueError as e:
+        raise SnapshotError(f"Файл снимка поврежден: {e}") from e
+
+
+def snapshot_key(path=SNAPSHOT_FILE):
+    """Ключ книги, из которой записан снимок (None - снимка нет или он не читается)"""
+    try:
+        with open(path, 'rb') as f:
+            return read_header(f)
+    except (OSError, SnapshotError):
+        return None
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """
+    Загружает снимок
+    :return: словарь {имя: RecordStore}
+    """
+    with open(path, 'rb') as f:
+        read_header(f)
+        try:
+            payload = pickle.load(f)
+            return {name: RecordStore.from_columns(columns, values) for name, (columns, values) in payload.items()}
+        except (pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError) as e:
+            # Поврежденный снимок - как и отсутствующий: окно и cli загрузят данные иначе
+            raise SnapshotError(f"Снимок поврежден: {path} ({e})") from e
@@ -0,0 +1,233 @@
+import os
+import sqlite3
+from collections import OrderedDict
+
+from phone_lookup import NUMBER_SEPARATORS, SHEET_SOURCES, SOURCES, PhoneDirectory
+from phone_format import phone_key
+from search import FIELD_SEPARATOR, PHONE_QUERY, normalize_text, phone_digits
+
+DB_FILE = os.path.join("JSON", "directory.db")
+SCHEMA_VERSION = "2"  # Увеличивать при изменении таблиц: база прежней схемы считается пустой и перезаписывается
+
+
+def quote(name):
+    """Имя таблицы или колонки для SQL (в названиях колонок есть пробелы, точки и №)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def fts_conditions(table, column, tokens):
+    """
+    Условия поиска подстрок tokens в колонке таблицы FTS5 с токенизатором trigram, как в SearchIndex.search:
+    части от 3 символов ищутся по индексу (MATCH), более короткие - перебором (instr)
+    :return: (список условий SQL, параметры)
+    """
+    long_tokens = [token for token in tokens if len(token) >= 3]
+    conditions, params = [], []
+    if long_tokens:
+        conditions.append(f"{quote(table)} MATCH ?")
+        params.append(" AND ".join(f'{column} : "{token.replace(chr(34), chr(34) * 2)}"' for token in long_tokens))
+    for token in tokens:
+        if len(token) < 3:
+            conditions.append(f"instr({column}, ?) > 0")
+            params.append(token)
+    return conditions, params
+
+
+class PagedRows:
+    """
+    Результат запроса к базе как последовательность для VirtualTable: число строк считается
+    одним COUNT, строки подгружаются страницами LIMIT/OFFSET только для видимой части таблицы
+    """
+
+    def __init__(self, connection, table, columns, where, params, page_size=200, max_pages=8):
+        self.connection = connection
+        self.columns = columns
+        self.select = f"SELECT rowid, * FROM {quote(table)} {where} ORDER BY rowid LIMIT ? OFFSET ?"
+        self.count = f"SELECT COUNT(*) FROM {quote(table)} {where}"
+        self.params = params
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.total = None
+
+    def __len__(self):
+        if self.total is None:
+            self.total = self.connection.execute(self.count, self.params).fetchone()[0]
+        return self.total
+
+    def page(self, number):
+        rows = self.pages.get(number)
+        if rows is None:
+            cursor = self.connection.execute(self.select, self.params + [self.page_size, number * self.page_size])
+            rows = [dict(zip(self.columns, row[1:])) for row in cursor]
+            self.pages[number] = rows
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(number)
+        return rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PagedRows index out of range")
+        return self.page(index // self.page_size)[index % self.page_size]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class DirectoryDB:
+    """
+    Справочник в SQLite: лист - таблица с индексом по подразделению, номера телефонов - отдельная
+    таблица с индексом по цифрам номера с конца (для поиска владельца номера), строки поиска
+    SearchIndex (ФИО и цифры номеров) - в таблице FTS5 с токенизатором trigram.
+    Поиск и фильтр выполняются запросами по индексам, данные в память целиком не загружаются.
+    """
+
+    def __init__(self, path=DB_FILE):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL: импорт в фоновом потоке переписывает базу, а окно в это время читает прежние данные без ожидания
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.columns = {}
+
+    def close(self):
+        self.connection.close()
+
+    def reload(self):
+        """Сбрасывает сведения о колонках листов (после перезаписи базы другим соединением)"""
+        self.columns = {}
+
+    def meta(self, name):
+        """Значение из таблицы meta; база другой схемы (SCHEMA_VERSION) считается пустой"""
+        rows = dict(self.connection.execute("SELECT name, value FROM meta WHERE name IN ('schema', ?)", (name,)))
+        return rows.get(name) if rows.get("schema") == SCHEMA_VERSION else None
+
+    def source_key(self):
+        """Ключ книги, из которой заполнена база (см. ParseCache.make_key), None - база пустая"""
+        return self.meta("key")
+
+    def sheets(self):
+        """Листы, записанные в базу"""
+        value = self.meta("sheets")
+        return value.split(",") if value else []
+
+    def table_columns(self, sheet):
+        if sheet not in self.columns:
+            cursor = self.connection.execute(f"SELECT * FROM {quote(sheet)} LIMIT 0")
+            self.columns[sheet] = [description[0] for description in cursor.description]
+        return self.columns[sheet]
+
+    def write_sheets(self, sheets, key=""):
+        """
+        Заменяет содержимое базы данными листов одной транзакцией
+        :param sheets: словарь {лист: RecordStore}; поиск строится для листов из SHEET_SOURCES
+        """
+        with self.connection:
+            # Без явного BEGIN модуль sqlite3 выполняет DROP/CREATE вне транзакции, и окно видит пустую базу
+            self.connection.execute("BEGIN")
+            row = self.connection.execute("SELECT value FROM meta WHERE name = 'sheets'").fetchone()
+            for sheet in set(row[0].split(",") if row and row[0] else []) | set(sheets):
+                for table in (sheet, f"{sheet}_phones", f"{sheet}_fts"):
+                    self.connection.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+            for sheet, store in sheets.items():
+                self.write_sheet(sheet, store)
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('key', ?), ('sheets', ?), ('schema', ?)",
+                                    (key, ",".join(sheets), SCHEMA_VERSION))
+        self.columns = {}
+
+    def write_sheet(self, sheet, store):
+        columns = list(store.columns)
+        self.connection.execute(f"CREATE TABLE {quote(sheet)} ({', '.join(quote(column) for column in columns)})")
+        self.connection.executemany(
+            f"INSERT INTO {quote(sheet)} (rowid, {', '.join(quote(column) for column in columns)}) "
+            f"VALUES (?{', ?' * len(columns)})",
+            ((row,) + values for row, values in enumerate(zip(*[store.column(column) for column in columns]))))
+
+        fields = SOURCES.get(SHEET_SOURCES.get(sheet))
+        if fields is None:
+            return
+        self.connection.execute(f"CREATE INDEX {quote(sheet + '_dept')} ON {quote(sheet)} ({quote(fields['dept'])})")
+
+        # Номера телефонов: по строке на номер, цифры записаны с конца для поиска по окончанию номера
+        phones = quote(f"{sheet}_phones")
+        self.connection.execute(f"CREATE TABLE {phones} (id INTEGER, kind TEXT, number TEXT, reversed TEXT)")
+        self.connection.executemany(
+            f"INSERT INTO {phones} VALUES (?, ?, ?, ?)",
+            ((row, kind, part.strip(), digits[::-1])
+             for kind in ("city", "internal")
+             for row, value in enumerate(store.column(fields[kind]))
+             for part in NUMBER_SEPARATORS.split(str(value)) for digits in (phone_key(part),) if digits))
+        self.connection.execute(f"CREATE INDEX {quote(sheet + '_phones_reversed')} ON {phones} (reversed)")
+
+        # Строки поиска те же, что у SearchIndex: ФИО и цифры номеров, поля через FIELD_SEPARATOR.
+        # Токенизатор trigram находит любую подстроку, а не только начала слов
+        fts = quote(f"{sheet}_fts")
+        self.connection.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5(names, phones, tokenize='trigram')")
+        name_columns = [store.column(field) for field in fields["fio"]]
+        phone_columns = [store.column(fields["city"]), store.column(fields["internal"])]
+        self.connection.executemany(
+            f"INSERT INTO {fts} (rowid, names, phones) VALUES (?, ?, ?)",
+            ((row, FIELD_SEPARATOR.join(normalize_text(value) for value in names),
+              FIELD_SEPARATOR.join(phone_digits(value) for value in phones))
+             for row, (names, phones) in enumerate(zip(zip(*name_columns), zip(*phone_columns)))))
+
+    def query(self, sheet, query="", dept=None, page_size=200):
+        """
+        Записи листа по строке поиска и подразделению
+        :param query: части ФИО через пробел или часть номера телефона - как в SearchIndex.search
+        :return: PagedRows (строки - словари)
+        """
+        fields = SOURCES[SHEET_SOURCES[sheet]]
+        conditions, params = [], []
+        query = query.strip()
+        if PHONE_QUERY.match(query):
+            column, tokens = "phones", [phone_digits(query)]
+        else:
+            column, tokens = "names", normalize_text(query).split()
+        if tokens:
+            fts = f"{sheet}_fts"
+            fts_where, fts_params = fts_conditions(fts, column, tokens)
+            conditions.append(f"rowid IN (SELECT rowid FROM {quote(fts)} WHERE {' AND '.join(fts_where)})")
+            params += fts_params
+        if dept:
+            conditions.append(f"{quote(fields['dept'])} = ?")
+            params.append(dept)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return PagedRows(self.connection, sheet, self.table_columns(sheet), where, params, page_size)
+
+    def departments(self, sheet):
+        """Подразделения листа в порядке первого появления и число записей в каждом"""
+        dept = quote(SOURCES[SHEET_SOURCES[sheet]]["dept"])
+        return self.connection.execute(
+            f"SELECT {dept}, COUNT(*) FROM {quote(sheet)} WHERE {dept} IS NOT NULL AND {dept} != '' "
+            f"GROUP BY {dept} ORDER BY MIN(rowid)").fetchall()
+
+    def lookup(self, number):
+        """
+        Владельцы номера, как PhoneDirectory.lookup: самое длинное совпадение по концу номера,
+        внутренние номера - только целиком
+        """
+        digits = phone_key(number)[::-1]
+        for length in range(len(digits), 0, -1):
+            owners = []
+            for sheet in self.sheets():
+                if sheet not in SHEET_SOURCES:
+                    continue
+                columns = self.table_columns(sheet)
+                rows = self.connection.execute(
+                    f"SELECT p.kind, p.number, t.* FROM {quote(sheet + '_phones')} p "
+                    f"JOIN {quote(sheet)} t ON t.rowid = p.id WHERE p.reversed = ?", (digits[:length],))
+                owners += [PhoneDirectory.describe(kind, number, SHEET_SOURCES[sheet], dict(zip(columns, values)))
+                           for kind, number, *values in rows if kind == "city" or length == len(digits)]
+            if owners:
+                return owners
+        return []
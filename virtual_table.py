@@ -0,0 +1,136 @@
+class VirtualTable:
+    """
+    Виртуальный режим ttk.Treeview: в таблице существуют только видимые строки и небольшой запас.
+    При прокрутке значения уже созданных строк заменяются через tree.item, поэтому стоимость
+    отрисовки не зависит от количества записей.
+    """
+
+    def __init__(self, tree, scrollbar, buffer=3):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.buffer = buffer
+        self.items = []  # Все записи (отображаются только items[offset:offset + page])
+        self.to_values = tuple
+        self.offset = 0
+        self.selected = None  # Индекс выделенной записи в self.items
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.configure(yscrollcommand='')
+
+        self.tree.bind("<Configure>", lambda event: self.render())
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Down>", lambda event: self.on_key(1))
+        self.tree.bind("<Up>", lambda event: self.on_key(-1))
+        self.tree.bind("<Next>", lambda event: self.on_key(self.visible_rows()))
+        self.tree.bind("<Prior>", lambda event: self.on_key(-self.visible_rows()))
+        self.tree.bind("<Home>", lambda event: self.on_key(-len(self.items)))
+        self.tree.bind("<End>", lambda event: self.on_key(len(self.items)))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select, add='+')
+
+    def set_rows(self, items, to_values=tuple, keep_position=False, selected=None):
+        """
+        Задает новый набор записей
+        :param items: последовательность записей
+        :param to_values: функция, возвращающая кортеж значений колонок для записи
+        :param keep_position: сохранить прокрутку (при обновлении тех же данных)
+        :param selected: индекс записи в items, которая остается выделенной (None - выделение снимается)
+        """
+        self.items = items
+        self.to_values = to_values
+        if not keep_position:
+            self.offset = 0
+        self.selected = selected if selected is not None and 0 <= selected < len(items) else None
+        self.render()
+
+    def visible_rows(self):
+        """Количество строк, которое помещается в видимую часть таблицы"""
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if bbox:
+            y, row_height = bbox[1], bbox[3]
+            return max(1, (self.tree.winfo_height() - y) // max(1, row_height))
+        return max(1, int(self.tree.cget("height")))
+
+    def max_offset(self):
+        return max(0, len(self.items) - self.visible_rows())
+
+    def render(self):
+        """Перерисовывает окно записей, начиная с self.offset"""
+        visible = self.visible_rows()
+        self.offset = max(0, min(self.offset, len(self.items) - visible))
+        window = self.items[self.offset:self.offset + visible + self.buffer]
+
+        children = self.tree.get_children()
+        for slot, item in enumerate(window):
+            values = self.to_values(item)
+            if slot < len(children):
+                self.tree.item(children[slot], values=values)
+            else:
+                self.tree.insert("", "end", iid=str(slot), values=values)
+        if len(children) > len(window):
+            self.tree.delete(*children[len(window):])
+        self.tree.yview_moveto(0)
+
+        # Выделение привязано к записи, а не к строке таблицы
+        slot = None if self.selected is None else self.selected - self.offset
+        if slot is not None and 0 <= slot < len(window):
+            self.tree.selection_set(str(slot))
+            self.tree.focus(str(slot))
+        elif self.tree.selection():
+            self.tree.selection_set(())
+
+        if self.items:
+            self.scrollbar.set(self.offset / len(self.items),
+                               min(1.0, (self.offset + visible) / len(self.items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        offset = max(0, min(self.offset + rows, self.max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Команда полосы прокрутки: ('moveto', доля) или ('scroll', n, 'units'|'pages')"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.items))
+            self.render()
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows()
+            self.scroll(step)
+
+    def on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = self.offset + int(selection[0])
+
+    def on_key(self, step):
+        """Перемещение выделения клавишами с подкачкой записей при выходе за видимую часть"""
+        if not self.items:
+            return "break"
+        current = self.offset if self.selected is None else self.selected
+        self.selected = max(0, min(current + step, len(self.items) - 1))
+        visible = self.visible_rows()
+        if self.selected < self.offset:
+            self.offset = self.selected
+        elif self.selected >= self.offset + visible:
+            self.offset = self.selected - visible + 1
+        self.render()
+        return "break"
+
+    def selected_item(self):
+        """Выделенная запись или None"""
+        if self.selected is None or self.selected >= len(self.items):
+            return None
+        return self.items[self.selected]